@@ -0,0 +1,250 @@
+import argparse
+import time
+import numpy as np
+from TetrisGame.pieces import FIGURES_POS, ROTATIONS, NUM_SHAPES, NUM_ROTATIONS, spawn_position
+from TetrisGame.tetris_engine import LEFT, RIGHT, ROTATE, SOFT_DROP, SCORES, TICK_RATE
+from TetrisGame.difficulty import DIFFICULTY_PROFILES, profile_gravity
+
+# OFFSETS[shape, rotation, cell] -> (dx, dy) from the center cell
+OFFSETS = np.array(ROTATIONS, dtype=np.int64)
+SCORE_TABLE = np.array([SCORES[lines] for lines in range(len(SCORES))],
+                       dtype=np.int64)
+
+
+class TetrisVecEnv:
+    """Runs the TetrisEngine rules on N boards at once with NumPy.
+
+    Every board is a (H, W) bool array and every piece/gravity variable is
+    an array of length N, so one step() is a fixed number of vectorized
+    operations whatever the batch size. Finished boards are reset
+    automatically at the end of the step that ended them.
+    """
+
+    def __init__(self, num_envs, gravity, gravity_increase, lock_gravity=None,
+                 soft_drop_factor=10, width=10, height=15, seed=None,
+                 tick_rate=TICK_RATE):
+        self.num_envs = num_envs
+        self.W, self.H = width, height
+        self.tick_rate = tick_rate
+
+        # Gravity settings are in rows per second like TetrisEngine and can
+        # be scalars or one value per board
+        if lock_gravity is None:
+            lock_gravity = gravity
+        self.start_gravity = self._per_env(gravity)
+        self.gravity_increase = self._per_env(gravity_increase)
+        self.lock_gravity = self._per_env(lock_gravity)
+        self.soft_drop_factor = self._per_env(soft_drop_factor)
+
+        self.spawn_xy = np.array([spawn_position(shape, width)
+                                  for shape in range(len(FIGURES_POS))],
+                                 dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+
+        n = num_envs
+        self.board = np.zeros((n, height, width), dtype=bool)
+        self.shape = np.zeros(n, dtype=np.int64)
+        self.next_shape = np.zeros(n, dtype=np.int64)
+        self.rotation = np.zeros(n, dtype=np.int64)
+        self.piece_x = np.zeros(n, dtype=np.int64)
+        self.piece_y = np.zeros(n, dtype=np.int64)
+        self.gravity = np.zeros(n)
+        self.fall_progress = np.zeros(n)
+        self.soft_drop = np.zeros(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lines = np.zeros(n, dtype=np.int64)
+        self.pieces = np.zeros(n, dtype=np.int64)
+        self.ticks = np.zeros(n, dtype=np.int64)
+
+    def _per_env(self, value):
+        return np.broadcast_to(np.asarray(value, dtype=np.float64),
+                               (self.num_envs,)).copy()
+
+    def reset(self):
+        """Reset every board and return the first observation"""
+        self._reset_envs(np.arange(self.num_envs))
+        return self.observe()
+
+    def _reset_envs(self, idx):
+        self.board[idx] = False
+        self.gravity[idx] = self.start_gravity[idx]
+        self.fall_progress[idx] = 0
+        self.soft_drop[idx] = False
+        self.score[idx] = 0
+        self.lines[idx] = 0
+        self.pieces[idx] = 0
+        self.ticks[idx] = 0
+        self.next_shape[idx] = self.rng.integers(NUM_SHAPES, size=len(idx))
+        self._spawn(idx)
+
+    def _spawn(self, idx):
+        shape = self.next_shape[idx]
+        self.shape[idx] = shape
+        self.next_shape[idx] = self.rng.integers(NUM_SHAPES, size=len(idx))
+        self.rotation[idx] = 0
+        self.piece_x[idx] = self.spawn_xy[shape, 0]
+        self.piece_y[idx] = self.spawn_xy[shape, 1]
+
+    def observe(self, out=None):
+        """Current state of all boards as a dict of arrays.
+
+        The arrays are copies, step() changes the env's own arrays in
+        place. Pass a dict returned by an earlier observe() as `out` to
+        have its arrays overwritten and returned instead, without
+        allocating.
+        """
+        state = {
+            'board': self.board,
+            'shape': self.shape,
+            'rotation': self.rotation,
+            'x': self.piece_x,
+            'y': self.piece_y,
+            'next_shape': self.next_shape,
+        }
+        if out is None:
+            return {key: value.copy() for key, value in state.items()}
+        for key, value in state.items():
+            np.copyto(out[key], value)
+        return out
+
+    def _fits(self, idx, rotation, x, y):
+        """Vectorized collision test for the pieces of boards idx"""
+        offsets = OFFSETS[self.shape[idx], rotation]
+        cells_x = x[:, None] + offsets[:, :, 0]
+        cells_y = y[:, None] + offsets[:, :, 1]
+        inside = (cells_x >= 0) & (cells_x < self.W) & (cells_y < self.H)
+        # Cells above the top edge are free
+        filled = self.board[idx[:, None],
+                            np.clip(cells_y, 0, self.H - 1),
+                            np.clip(cells_x, 0, self.W - 1)]
+        free = inside & ((cells_y < 0) | ~filled)
+        return free.all(axis=1)
+
+    def step(self, actions, out=None):
+        """Advance every board by one tick.
+
+        actions is an int array of TetrisEngine input bits, one per board.
+        Returns (observation, rewards, dones, info) where rewards is the
+        score gained this tick and info['lines'] the lines cleared. The
+        observation goes into `out` when given, as in observe().
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        everyone = np.arange(self.num_envs)
+        rewards = np.zeros(self.num_envs, dtype=np.int64)
+        cleared = np.zeros(self.num_envs, dtype=np.int64)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        self.ticks += 1
+
+        # Move x
+        dx = ((actions & RIGHT) >> 1) - (actions & LEFT)
+        idx = everyone[dx != 0]
+        if len(idx):
+            new_x = self.piece_x[idx] + dx[idx]
+            ok = self._fits(idx, self.rotation[idx], new_x, self.piece_y[idx])
+            self.piece_x[idx[ok]] = new_x[ok]
+
+        # Rotate
+        idx = everyone[(actions & ROTATE) != 0]
+        if len(idx):
+            new_rotation = (self.rotation[idx] + 1) % NUM_ROTATIONS
+            ok = self._fits(idx, new_rotation, self.piece_x[idx], self.piece_y[idx])
+            self.rotation[idx[ok]] = new_rotation[ok]
+
+        # A soft drop lasts until the piece locks
+        self.soft_drop |= (actions & SOFT_DROP) != 0
+
+        # Move y, boards with fast gravity can drop several rows per tick
+        rate = np.where(self.soft_drop,
+                        self.gravity * self.soft_drop_factor, self.gravity)
+        self.fall_progress += rate / self.tick_rate
+        idx = everyone[self.fall_progress >= 1]
+        while len(idx):
+            self.fall_progress[idx] -= 1
+            new_y = self.piece_y[idx] + 1
+            ok = self._fits(idx, self.rotation[idx], self.piece_x[idx], new_y)
+            self.piece_y[idx[ok]] = new_y[ok]
+            locking = idx[~ok]
+            if len(locking):
+                lines = self._lock(locking)
+                rewards[locking] = SCORE_TABLE[lines]
+                cleared[locking] = lines
+
+                # Top out, the rest get their next piece
+                topped = self.board[locking, 0].any(axis=1)
+                dones[locking[topped]] = True
+                self._spawn(locking[~topped])
+            idx = idx[ok]
+            idx = idx[self.fall_progress[idx] >= 1]
+
+        info = {'lines': cleared}
+        finished = everyone[dones]
+        if len(finished):
+            # Report the finished games before their boards are reset
+            info['final_score'] = self.score[finished].copy()
+            info['final_lines'] = self.lines[finished].copy()
+            info['final_pieces'] = self.pieces[finished].copy()
+            info['final_ticks'] = self.ticks[finished].copy()
+            info['finished'] = finished
+            self._reset_envs(finished)
+        return self.observe(out), rewards, dones, info
+
+    def _lock(self, idx):
+        """Lock the pieces of boards idx and clear their full lines"""
+        offsets = OFFSETS[self.shape[idx], self.rotation[idx]]
+        cells_x = self.piece_x[idx, None] + offsets[:, :, 0]
+        cells_y = self.piece_y[idx, None] + offsets[:, :, 1]
+        # Cells still above the top edge are lost
+        visible = cells_y >= 0
+        rows = np.broadcast_to(idx[:, None], cells_x.shape)
+        self.board[rows[visible], cells_y[visible], cells_x[visible]] = True
+        self.pieces[idx] += 1
+        self.soft_drop[idx] = False
+        self.fall_progress[idx] = 0
+
+        boards = self.board[idx]
+        full = boards.all(axis=2)
+        lines = full.sum(axis=1)
+        clearing = lines > 0
+        if clearing.any():
+            sub = idx[clearing]
+            boards = boards[clearing]
+            full = full[clearing]
+            # Stable sort puts the full rows on top in their original order
+            # and keeps the rest in order below them, then blank the top
+            order = np.argsort(~full, axis=1, kind='stable')
+            boards = np.take_along_axis(boards, order[:, :, None], axis=1)
+            boards[np.arange(self.H)[None, :] < lines[clearing, None]] = False
+            self.board[sub] = boards
+
+            self.lines[sub] += lines[clearing]
+            self.score[sub] += SCORE_TABLE[lines[clearing]]
+        # Every cleared line makes the game faster
+        self.gravity[idx] = self.lock_gravity[idx] + \
+            self.gravity_increase[idx] * self.lines[idx]
+        return lines
+
+
+def benchmark(batch_sizes, ticks, seed=0):
+    """Measure board-steps per second with random inputs"""
+    for num_envs in batch_sizes:
+        env = TetrisVecEnv(num_envs, **profile_gravity(DIFFICULTY_PROFILES['hard']),
+                           seed=seed)
+        observation = env.reset()
+        rng = np.random.default_rng(seed)
+        actions = rng.choice(np.array([0, 0, 0, LEFT, RIGHT, ROTATE, SOFT_DROP]),
+                             size=(ticks, num_envs))
+        start = time.perf_counter()
+        for tick in range(ticks):
+            env.step(actions[tick], out=observation)
+        elapsed = time.perf_counter() - start
+        print(f"{num_envs:>6} boards: {num_envs * ticks / elapsed:>12,.0f} board-steps/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Throughput of the batched Tetris simulator")
+    parser.add_argument('--batch-sizes', type=int, nargs='+',
+                        default=[1, 16, 256, 4096])
+    parser.add_argument('--ticks', type=int, default=500)
+    args = parser.parse_args()
+    benchmark(args.batch_sizes, args.ticks)
@@ -0,0 +1,257 @@
+class Board:
+    """Tetris field stored as one bitmask int per row plus a color plane.
+
+    The color plane is one byte per cell, row after row, indexing a palette
+    of up to 255 colors of the game (0 is empty). It can be handed to
+    pygame as an 8-bit image without any conversion. It is only ever
+    changed in place, never resized.
+
+    Per-row fill counts and per-column tops and hole counts are kept up to
+    date as pieces lock and lines clear, so evaluators and drop distance
+    checks never need to rescan the board.
+    """
+
+    PALETTE_SIZE = 256
+
+    def __init__(self, width, height):
+        self.W, self.H = width, height
+        # Mask with every column of a row set
+        self.full_row = (1 << width) - 1
+        # Largest to_bytes() result, a row mask per row and every cell's color
+        self.max_packed_size = height * ((width + 7) // 8) + width * height * 3
+        self.cells = bytearray(width * height)
+        self.reset()
+
+    def reset(self):
+        """Empty the board"""
+        self.rows = [0] * self.H
+        self.cells[:] = bytes(self.W * self.H)
+        # Palette entries and the index of each color in use
+        self.palette = [(0, 0, 0)] * self.PALETTE_SIZE
+        self.color_indices = {}
+        self.free_colors = list(range(self.PALETTE_SIZE - 1, 0, -1))
+        # Number of filled cells in each row
+        self.row_counts = [0] * self.H
+        # Row of the highest filled cell of each column, H when empty
+        self.tops = [self.H] * self.W
+        # Empty cells below the top of each column
+        self.holes = [0] * self.W
+
+    def is_filled(self, x, y):
+        return (self.rows[y] >> x) & 1
+
+    def color_index(self, color):
+        """Palette index of a color, adding it to the palette if needed"""
+        index = self.color_indices.get(color)
+        if index is not None:
+            return index
+        if not self.free_colors:
+            # Entries of colors no longer on the board are free again
+            used = set(self.cells)
+            for old, old_index in list(self.color_indices.items()):
+                if old_index not in used:
+                    del self.color_indices[old]
+                    self.free_colors.append(old_index)
+        if not self.free_colors:
+            # Every entry is on the board, use the closest color
+            return min(self.color_indices.values(), key=lambda i: sum(
+                (a - b) ** 2 for a, b in zip(self.palette[i], color)))
+        index = self.free_colors.pop()
+        self.palette[index] = color
+        self.color_indices[color] = index
+        return index
+
+    def row_colors(self, y):
+        """Colors of the filled cells of row y, left to right"""
+        row, palette = self.rows[y], self.palette
+        start = y * self.W
+        return [palette[self.cells[start + x]] for x in range(self.W)
+                if (row >> x) & 1]
+
+    def heights(self):
+        return [self.H - top for top in self.tops]
+
+    def max_height(self):
+        return self.H - min(self.tops)
+
+    def total_holes(self):
+        return sum(self.holes)
+
+    def collides(self, offsets, px, py):
+        """Check whether a piece with cell offsets at (px, py) is outside the
+        board or overlaps locked cells"""
+        rows = self.rows
+        for dx, dy in offsets:
+            x, y = px + dx, py + dy
+            if x < 0 or x >= self.W or y >= self.H:
+                return True
+            # Cells above the top edge are free
+            if y >= 0 and (rows[y] >> x) & 1:
+                return True
+        return False
+
+    def drop_distance(self, offsets, px, py):
+        """Number of rows a piece at (px, py) can fall before it lands"""
+        rows, tops = self.rows, self.tops
+        distance = self.H
+        for dx, dy in offsets:
+            x, y = px + dx, py + dy
+            if y < tops[x]:
+                # Nothing in the column between the cell and the stack
+                cell_distance = tops[x] - y - 1
+            else:
+                # The cell is tucked under an overhang, walk down to the
+                # next filled cell or the floor
+                below = y + 1
+                while below < self.H and not (rows[below] >> x) & 1:
+                    below += 1
+                cell_distance = below - y - 1
+            if cell_distance < distance:
+                distance = cell_distance
+        return distance
+
+    def place(self, offsets, px, py, color):
+        """Lock a piece with cell offsets at (px, py) into the board"""
+        rows, tops, holes = self.rows, self.tops, self.holes
+        index = self.color_index(color)
+        for dx, dy in offsets:
+            x, y = px + dx, py + dy
+            # Cells still above the top edge are lost, the top row check
+            # ends the game anyway
+            if y < 0:
+                continue
+            self.cells[y * self.W + x] = index
+            # A piece spawned into the stack can overlap locked cells
+            if (rows[y] >> x) & 1:
+                continue
+            rows[y] |= 1 << x
+            self.row_counts[y] += 1
+            if y < tops[x]:
+                # Empty cells between the old top (or the floor) and this
+                # cell are holes now
+                holes[x] += tops[x] - y - 1
+                tops[x] = y
+            else:
+                # Filled a hole under an overhang
+                holes[x] -= 1
+
+    def clear_lines(self, candidates=None):
+        """Remove full rows among candidates (all rows when None), collapse
+        the rest down and return the count"""
+        if candidates is None:
+            candidates = range(self.H)
+        full_row = self.full_row
+        full = sorted(y for y in set(candidates)
+                      if 0 <= y < self.H and self.rows[y] == full_row)
+        lines = len(full)
+        if not lines:
+            return 0
+
+        # Deleting from the bottom keeps the remaining indices valid
+        for y in reversed(full):
+            del self.rows[y]
+            del self.row_counts[y]
+        self.rows[:0] = [0] * lines
+        self.row_counts[:0] = [0] * lines
+        W, cells = self.W, self.cells
+        kept = b''.join(cells[y * W:(y + 1) * W] for y in range(self.H)
+                        if y not in full)
+        cells[:] = bytes(lines * W) + kept
+
+        # A full row fills every column, so each cleared row is at or below
+        # the top of every column
+        for x in range(self.W):
+            if self.tops[x] in full:
+                self._rescan_column(x)
+            else:
+                # Cleared rows hold no holes, the column just moves down
+                self.tops[x] += lines
+        return lines
+
+    def add_garbage(self, lines, hole, color):
+        """Push the stack up by `lines` rows that are full but for column
+        `hole`. Returns whether filled cells were pushed off the top."""
+        lines = min(lines, self.H)
+        overflow = any(self.rows[:lines])
+        row = self.full_row & ~(1 << hole)
+        del self.rows[:lines]
+        del self.row_counts[:lines]
+        self.rows += [row] * lines
+        self.row_counts += [self.W - 1] * lines
+        index = self.color_index(color)
+        cells = bytearray([index]) * self.W
+        cells[hole] = 0
+        self.cells[:] = self.cells[lines * self.W:] + cells * lines
+        # Garbage is rare next to locks, rescanning is simpler than
+        # shifting every column's top and holes
+        for x in range(self.W):
+            self._rescan_column(x)
+        return overflow
+
+    def set_rows(self, changes):
+        """Overwrite rows from (y, row mask, colors of the filled cells)
+        tuples, for boards that mirror a board kept somewhere else"""
+        for y, row, colors in changes:
+            self.rows[y] = row
+            self.row_counts[y] = bin(row).count('1')
+            colors = iter(colors)
+            start = y * self.W
+            for x in range(self.W):
+                self.cells[start + x] = (
+                    self.color_index(next(colors)) if (row >> x) & 1 else 0)
+        for x in range(self.W):
+            self._rescan_column(x)
+
+    def _rescan_column(self, x):
+        rows = self.rows
+        top = 0
+        while top < self.H and not (rows[top] >> x) & 1:
+            top += 1
+        holes = 0
+        for y in range(top + 1, self.H):
+            if not (rows[y] >> x) & 1:
+                holes += 1
+        self.tops[x], self.holes[x] = top, holes
+
+    def to_bytes(self):
+        """Pack the board: the row masks followed by the colors of the
+        filled cells only"""
+        row_bytes = (self.W + 7) // 8
+        data = bytearray()
+        for row in self.rows:
+            data += row.to_bytes(row_bytes, 'little')
+        for x, y, color in self.filled_cells():
+            data += bytes(color)
+        return bytes(data)
+
+    def load_bytes(self, data):
+        """Restore a board packed by to_bytes()"""
+        row_bytes = (self.W + 7) // 8
+        self.reset()
+        for y in range(self.H):
+            start = y * row_bytes
+            self.rows[y] = int.from_bytes(data[start:start + row_bytes], 'little')
+        pos = self.H * row_bytes
+        for x, y, _ in list(self.filled_cells()):
+            self.cells[y * self.W + x] = self.color_index(tuple(data[pos:pos + 3]))
+            pos += 3
+        self.row_counts = [bin(row).count('1') for row in self.rows]
+        for x in range(self.W):
+            self._rescan_column(x)
+        return pos
+
+    def is_topped_out(self):
+        """The game is over once anything is locked in the top row"""
+        return self.rows[0] != 0
+
+    def filled_cells(self):
+        """Yield (x, y, color) for every locked cell"""
+        cells, palette = self.cells, self.palette
+        for y, row in enumerate(self.rows):
+            x = 0
+            start = y * self.W
+            while row:
+                if row & 1:
+                    yield x, y, palette[cells[start + x]]
+                row >>= 1
+                x += 1
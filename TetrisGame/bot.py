@@ -0,0 +1,217 @@
+from TetrisGame.pieces import ROTATIONS, NUM_SHAPES
+from TetrisGame.tetris_engine import GameRandom, NOOP, LEFT, RIGHT, ROTATE, SOFT_DROP
+
+# Board evaluator weights
+HEIGHT_WEIGHT = -0.51     # Sum of the column heights
+LINES_WEIGHT = 0.76       # Lines cleared on the way to the board
+HOLES_WEIGHT = -0.36      # Empty cells covered by a filled cell
+BUMPINESS_WEIGHT = -0.18  # Height differences between neighbour columns
+# Value of a placement that tops out
+LOSS = -1e9
+
+
+def _distinct_rotations(shape):
+    """Rotation states of a shape that give different placements, with the
+    lowest cell offset of every column the piece covers"""
+    seen = set()
+    result = []
+    for rotation, offsets in enumerate(ROTATIONS[shape]):
+        min_dx = min(dx for dx, dy in offsets)
+        min_dy = min(dy for dx, dy in offsets)
+        cells = frozenset((dx - min_dx, dy - min_dy) for dx, dy in offsets)
+        if cells in seen:
+            continue
+        seen.add(cells)
+        bottoms = {}
+        for dx, dy in offsets:
+            bottoms[dx] = max(bottoms.get(dx, dy), dy)
+        result.append((rotation, offsets, tuple(bottoms.items())))
+    return result
+
+
+PLACEMENT_ROTATIONS = [_distinct_rotations(shape) for shape in range(NUM_SHAPES)]
+
+
+class TetrisBot:
+    """Picks a placement for every piece with a beam search over the
+    current and the next piece.
+
+    Boards are plain lists of row masks. Evaluated boards are stored in a
+    transposition table keyed by their Zobrist hash, so positions reached
+    by different placement orders, or already seen while looking ahead for
+    the previous piece, are not evaluated again.
+    """
+
+    def __init__(self, width=10, height=15, beam_width=6, table_size=200000,
+                 reaction_ticks=0, input_interval=1):
+        self.W, self.H = width, height
+        self.full_row = (1 << width) - 1
+        self.beam_width = beam_width
+        # Play like a person for simulations: wait reaction_ticks after a
+        # piece spawns and only press something every input_interval ticks
+        self.reaction_ticks = reaction_ticks
+        self.input_interval = input_interval
+
+        # One random key per cell, a board hashes to the XOR of its cells
+        rng = GameRandom(0x5EED)
+        self.zobrist = [[rng.next64() for x in range(width)]
+                        for y in range(height)]
+        self.table = {}
+        self.table_size = table_size
+
+        # Placement the controller is steering the current piece to
+        self.piece_id = None
+        self.target = None
+        self.next_input_tick = 0
+
+    def board_hash(self, rows):
+        key = 0
+        for y, row in enumerate(rows):
+            keys = self.zobrist[y]
+            while row:
+                low = row & -row
+                key ^= keys[low.bit_length() - 1]
+                row ^= low
+        return key
+
+    def _tops(self, rows):
+        """Row of the highest filled cell of each column"""
+        tops = [self.H] * self.W
+        covered = 0
+        for y, row in enumerate(rows):
+            new = row & ~covered
+            while new:
+                low = new & -new
+                tops[low.bit_length() - 1] = y
+                new ^= low
+            covered |= row
+            if covered == self.full_row:
+                break
+        return tops
+
+    def evaluate(self, rows, key):
+        """Heuristic value of a board, cached in the transposition table"""
+        value = self.table.get(key)
+        if value is not None:
+            return value
+
+        tops = [self.H] * self.W
+        covered = 0
+        holes = 0
+        for y, row in enumerate(rows):
+            holes += (covered & ~row).bit_count()
+            new = row & ~covered
+            while new:
+                low = new & -new
+                tops[low.bit_length() - 1] = y
+                new ^= low
+            covered |= row
+        heights = [self.H - top for top in tops]
+        bumpiness = sum(abs(heights[x] - heights[x + 1])
+                        for x in range(self.W - 1))
+        value = (HEIGHT_WEIGHT * sum(heights) + HOLES_WEIGHT * holes +
+                 BUMPINESS_WEIGHT * bumpiness)
+
+        if len(self.table) >= self.table_size:
+            self.table.clear()
+        self.table[key] = value
+        return value
+
+    def placements(self, rows, key, shape):
+        """Yield (rotation, x, y, rows, key, lines) for every straight drop
+        of the shape, or with rows None when the placement tops out"""
+        tops = self._tops(rows)
+        zobrist, full_row = self.zobrist, self.full_row
+        for rotation, offsets, bottoms in PLACEMENT_ROTATIONS[shape]:
+            min_dx = min(dx for dx, dy in bottoms)
+            max_dx = max(dx for dx, dy in bottoms)
+            for x in range(-min_dx, self.W - max_dx):
+                # The piece lands where its first column meets the stack
+                y = min(tops[x + dx] - dy for dx, dy in bottoms) - 1
+                new_rows = rows[:]
+                new_key = key
+                landed = True
+                for dx, dy in offsets:
+                    cell_y = y + dy
+                    if cell_y < 0:
+                        landed = False
+                        break
+                    new_rows[cell_y] |= 1 << (x + dx)
+                    new_key ^= zobrist[cell_y][x + dx]
+                if not landed:
+                    yield rotation, x, y, None, 0, 0
+                    continue
+
+                full = [row for row in new_rows if row == full_row]
+                lines = len(full)
+                if lines:
+                    new_rows = [0] * lines + [row for row in new_rows
+                                              if row != full_row]
+                    new_key = self.board_hash(new_rows)
+                if new_rows[0]:
+                    yield rotation, x, y, None, 0, 0
+                    continue
+                yield rotation, x, y, new_rows, new_key, lines
+
+    def choose(self, rows, shape, next_shape):
+        """Best (rotation, x, y) for shape on the board, looking one piece
+        ahead. Returns None when every placement tops out."""
+        rows = list(rows)
+        key = self.board_hash(rows)
+
+        # First level: every placement of the current piece
+        candidates = []
+        for rotation, x, y, child, child_key, lines in self.placements(rows, key, shape):
+            if child is None:
+                continue
+            value = self.evaluate(child, child_key) + LINES_WEIGHT * lines
+            candidates.append((value, rotation, x, y, child, child_key, lines))
+        if not candidates:
+            return None
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+
+        # Second level: only the most promising placements are expanded
+        best, best_value = None, LOSS
+        for value, rotation, x, y, child, child_key, lines in candidates[:self.beam_width]:
+            child_best = LOSS
+            for *_, grandchild, grandchild_key, next_lines in self.placements(
+                    child, child_key, next_shape):
+                if grandchild is None:
+                    continue
+                leaf = (self.evaluate(grandchild, grandchild_key) +
+                        LINES_WEIGHT * (lines + next_lines))
+                if leaf > child_best:
+                    child_best = leaf
+            if best is None or child_best > best_value:
+                best, best_value = (rotation, x, y), child_best
+        return best
+
+    def needs_search(self, engine):
+        """Whether next_action() will search, the engine has a new piece"""
+        return (engine.seed, engine.pieces) != self.piece_id
+
+    def next_action(self, engine):
+        """Input for this tick that steers the engine's piece towards the
+        chosen placement, searching once per new piece"""
+        piece_id = (engine.seed, engine.pieces)
+        if piece_id != self.piece_id:
+            self.piece_id = piece_id
+            self.target = self.choose(engine.board.rows, engine.shape,
+                                      engine.next_shape)
+            self.next_input_tick = engine.ticks + self.reaction_ticks
+        if engine.ticks < self.next_input_tick:
+            return NOOP
+        self.next_input_tick = engine.ticks + self.input_interval
+        if self.target is None:
+            return SOFT_DROP
+
+        rotation, x, _ = self.target
+        action = NOOP
+        if engine.rotation != rotation:
+            action |= ROTATE
+        if engine.piece_x < x:
+            action |= RIGHT
+        elif engine.piece_x > x:
+            action |= LEFT
+        # Drop once the piece is lined up
+        return action or SOFT_DROP
@@ -0,0 +1,118 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+import time
+from TetrisGame.tetris_engine import TICK_RATE
+from TetrisGame.difficulty import DIFFICULTY_PROFILES, profile_gravity
+from TetrisGame.selfplay import simulate
+
+# Profile values a sweep can vary, with their command line options
+GRID_KEYS = ('anim_speed', 'anim_limit', 'speed_increase')
+# Column headers of the grid values, at most 5 characters like the values
+GRID_LABELS = {'anim_speed': 'speed', 'anim_limit': 'limit',
+               'speed_increase': 'incr'}
+
+
+def play(task):
+    """Play one calibration game in a worker, returns (candidate, ticks,
+    score, lines, topped out)"""
+    index, gravity, seed, options = task
+    engine = simulate(gravity, seed, **options)
+    return index, engine.ticks, engine.score, engine.lines, engine.game_over
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted values"""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def candidates(args):
+    """(label, profile) pairs to simulate: the grid when any grid option is
+    given, the named difficulty profiles otherwise"""
+    grid = {key: getattr(args, key) for key in GRID_KEYS}
+    if not any(grid.values()):
+        return [(name, DIFFICULTY_PROFILES[name]) for name in args.profile]
+
+    # Axes that are not swept keep the base profile value
+    base = DIFFICULTY_PROFILES[args.base]
+    axes = [grid[key] or [base[key]] for key in GRID_KEYS]
+    result = []
+    for values in itertools.product(*axes):
+        profile = dict(zip(GRID_KEYS, values))
+        label = ' '.join(f"{value:>5}" for value in values)
+        result.append((label, profile))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Estimate survival time and score of Tetris difficulty "
+                    "profiles with simulated games")
+    parser.add_argument('--profile', nargs='+', choices=list(DIFFICULTY_PROFILES),
+                        default=list(DIFFICULTY_PROFILES),
+                        help="profiles to simulate when no grid is given")
+    parser.add_argument('--anim-speed', type=int, nargs='+')
+    parser.add_argument('--anim-limit', type=int, nargs='+')
+    parser.add_argument('--speed-increase', type=int, nargs='+')
+    parser.add_argument('--base', choices=list(DIFFICULTY_PROFILES), default='hard',
+                        help="profile the grid takes unswept values from")
+    parser.add_argument('--games', type=int, default=50,
+                        help="games per profile")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--policy', choices=['bot', 'random'], default='bot')
+    # A bot that reacts instantly survives any gravity, these make it
+    # about as fast as a person
+    parser.add_argument('--reaction-ticks', type=int, default=20)
+    parser.add_argument('--input-interval', type=int, default=8)
+    parser.add_argument('--max-ticks', type=int, default=TICK_RATE * 60 * 10)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+
+    profiles = candidates(args)
+    options = {
+        'policy': args.policy,
+        'max_ticks': args.max_ticks,
+        'reaction_ticks': args.reaction_ticks,
+        'input_interval': args.input_interval,
+    }
+    # Every profile plays the same seeds
+    tasks = [(index, profile_gravity(profile), args.seed + game, options)
+             for index, (label, profile) in enumerate(profiles)
+             for game in range(args.games)]
+
+    start = time.perf_counter()
+    results = [[] for _ in profiles]
+    with multiprocessing.Pool(args.workers) as pool:
+        for index, *result in pool.imap_unordered(play, tasks):
+            results[index].append(result)
+    elapsed = time.perf_counter() - start
+
+    if any(getattr(args, key) for key in GRID_KEYS):
+        header = ' '.join(f"{GRID_LABELS[key]:>5}" for key in GRID_KEYS)
+    else:
+        header = 'profile'
+    width = max(len(header), *(len(label) for label, _ in profiles))
+    print(f"{header:<{width}}   survival s: mean   p10   p50   p90"
+          f"   score: mean    p50    p90  lines  topped")
+    for (label, _), games in zip(profiles, results):
+        seconds = sorted(ticks / TICK_RATE for ticks, *_ in games)
+        scores = sorted(score for _, score, _, _ in games)
+        lines = sum(game[2] for game in games) / len(games)
+        topped = sum(game[3] for game in games) / len(games)
+        print(f"{label:<{width}}               "
+              f"{sum(seconds) / len(seconds):>5.0f} "
+              f"{percentile(seconds, 0.1):>5.0f} "
+              f"{percentile(seconds, 0.5):>5.0f} "
+              f"{percentile(seconds, 0.9):>5.0f}"
+              f"         {sum(scores) / len(scores):>6.0f} "
+              f"{percentile(scores, 0.5):>6} "
+              f"{percentile(scores, 0.9):>6} "
+              f"{lines:>6.1f} {topped:>6.0%}")
+    print(f"{len(tasks)} games in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import argparse
+import glob
+import os
+import queue
+import threading
+import numpy as np
+
+# Columns of a shard, the board is one (H, W) bool array per sample
+SAMPLE_FIELDS = {
+    'shape': np.uint8,
+    'next_shape': np.uint8,
+    'rotation': np.uint8,
+    'x': np.int16,
+    'y': np.int16,
+    'reward': np.int32,
+}
+
+
+class DatasetWriter:
+    """Streams placement samples into compressed .npz shards of at most
+    shard_size samples, by default as many as fit in about 16 MB.
+
+    Samples go into a preallocated shard buffer. A full buffer is handed to
+    a background thread that compresses and writes it while add() goes on
+    in the next free buffer, so only `buffers` shards are ever held in
+    memory. add() only waits when the writer is that many shards behind.
+    """
+
+    def __init__(self, directory, width=10, height=15, shard_size=None,
+                 prefix='tetris', buffers=3):
+        self.directory = directory
+        self.W, self.H = width, height
+        if shard_size is None:
+            sample_size = width * height + sum(
+                np.dtype(dtype).itemsize for dtype in SAMPLE_FIELDS.values())
+            shard_size = max(1, (16 << 20) // sample_size)
+        self.shard_size = shard_size
+        self.prefix = prefix
+        os.makedirs(directory, exist_ok=True)
+
+        self.free = queue.Queue()
+        for _ in range(buffers):
+            self.free.put(self._new_buffer())
+        self.full = queue.Queue()
+        self.thread = threading.Thread(target=self._write_shards, daemon=True)
+        self.thread.start()
+
+        self.buffer = self.free.get()
+        self.count = 0
+        self.shards = 0
+        self.samples = 0
+        self.closed = False
+
+    def _new_buffer(self):
+        buffer = {name: np.zeros(self.shard_size, dtype=dtype)
+                  for name, dtype in SAMPLE_FIELDS.items()}
+        buffer['board'] = np.zeros((self.shard_size, self.H, self.W), dtype=bool)
+        return buffer
+
+    def add(self, rows, shape, next_shape, rotation, x, y, reward):
+        """Add one sample, rows are the board's row masks before the piece
+        locked"""
+        row_bytes = (self.W + 7) // 8
+        packed = np.frombuffer(
+            b''.join(row.to_bytes(row_bytes, 'little') for row in rows),
+            dtype=np.uint8).reshape(self.H, row_bytes)
+        buffer, i = self.buffer, self.count
+        buffer['board'][i] = np.unpackbits(packed, axis=1,
+                                           bitorder='little')[:, :self.W]
+        buffer['shape'][i] = shape
+        buffer['next_shape'][i] = next_shape
+        buffer['rotation'][i] = rotation
+        buffer['x'][i] = x
+        buffer['y'][i] = y
+        buffer['reward'][i] = reward
+        self.count += 1
+        self.samples += 1
+        if self.count == self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """Send the samples added so far to the writer as one shard"""
+        if not self.count:
+            return
+        path = os.path.join(self.directory,
+                            f"{self.prefix}-{self.shards:05d}.npz")
+        self.full.put((path, self.buffer, self.count))
+        self.shards += 1
+        self.buffer = self.free.get()
+        self.count = 0
+
+    def close(self):
+        """Write the last partial shard and wait for the writer to finish"""
+        if self.closed:
+            return
+        self.closed = True
+        self.flush()
+        self.full.put(None)
+        self.thread.join()
+
+    def _write_shards(self):
+        while True:
+            item = self.full.get()
+            if item is None:
+                return
+            path, buffer, count = item
+            try:
+                # zlib releases the GIL while it compresses
+                np.savez_compressed(path, **{name: column[:count]
+                                             for name, column in buffer.items()})
+            except OSError as e:
+                print(f"Error writing dataset shard: {e}")
+            self.free.put(buffer)
+
+
+class PlacementRecorder:
+    """Turns the pieces an engine locks into DatasetWriter samples.
+    Call observe() after every engine.step()."""
+
+    def __init__(self, engine, writer):
+        self.engine = engine
+        self.writer = writer
+        self.start()
+
+    def start(self):
+        """Remember the board and pieces the current piece spawned with"""
+        engine = self.engine
+        self.piece_id = (engine.seed, engine.pieces)
+        self.rows = tuple(engine.board.rows)
+        self.shape, self.next_shape = engine.shape, engine.next_shape
+        self.score = engine.score
+
+    def observe(self):
+        engine = self.engine
+        piece_id = (engine.seed, engine.pieces)
+        if piece_id == self.piece_id:
+            return
+        # Exactly one more piece of the same game locked, anything else is
+        # a reset or a rewind and starts over
+        if piece_id == (self.piece_id[0], self.piece_id[1] + 1):
+            shape, rotation, x, y = engine.last_placement
+            self.writer.add(self.rows, shape, self.next_shape, rotation, x, y,
+                            engine.score - self.score)
+        self.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a Tetris dataset")
+    parser.add_argument('directory')
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.directory, '*.npz')))
+    samples, lines, size = 0, 0, 0
+    for path in paths:
+        with np.load(path) as shard:
+            samples += len(shard['shape'])
+            lines += np.count_nonzero(shard['reward'])
+        size += os.path.getsize(path)
+    print(f"{len(paths)} shards, {samples} samples, {size / 1e6:.1f} MB, "
+          f"{size / max(samples, 1):.1f} bytes per sample, "
+          f"{lines} placements cleared lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+from TetrisGame.tetris_engine import gravity_from_anim, TICK_RATE
+
+# Falling speed of each difficulty in the old frame-counter units: anim_speed
+# is added to a counter every frame and the piece drops one row once the
+# counter passes anim_limit, anim_speed grows by speed_increase per cleared
+# line. anim_limit is also the limit restored after every lock.
+DIFFICULTY_PROFILES = {
+    'easy': {
+        'anim_speed': 60,
+        'anim_limit': 2000,
+        'speed_increase': 2,  # Smaller speed increase when clearing lines
+        'color': 'green',
+    },
+    'medium': {
+        'anim_speed': 80,
+        'anim_limit': 1500,
+        'speed_increase': 3,
+        'color': 'yellow',
+    },
+    'hard': {
+        'anim_speed': 150,
+        'anim_limit': 700,
+        'speed_increase': 6,
+        'color': 'red',
+    },
+}
+
+
+def difficulty_name(difficulty):
+    """Profile name for a difficulty, 'difficult' and anything unknown is
+    'hard'"""
+    difficulty = difficulty.lower()
+    return difficulty if difficulty in DIFFICULTY_PROFILES else 'hard'
+
+
+def profile_gravity(profile, fps=TICK_RATE):
+    """TetrisEngine gravity arguments for a profile dict"""
+    return gravity_from_anim(profile['anim_speed'], profile['anim_limit'],
+                             profile['speed_increase'], fps=fps)
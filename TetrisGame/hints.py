@@ -0,0 +1,128 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from TetrisGame.pieces import ROTATIONS
+from TetrisGame.bot import TetrisBot
+
+# Bot of the worker process, kept between hints so its transposition table
+# carries over from one piece to the next
+_bot = None
+
+
+def _start_worker():
+    # The game loop gets the CPU first when both want it
+    if hasattr(os, 'nice'):
+        os.nice(10)
+
+
+def _ready():
+    """Runs in the worker process, a first task that makes it start"""
+
+
+def suggest(rows, shape, next_shape, width, height):
+    """Runs in the worker process, returns the bot's (rotation, x, y)"""
+    global _bot
+    if _bot is None or (_bot.W, _bot.H) != (width, height):
+        _bot = TetrisBot(width, height)
+    return _bot.choose(rows, shape, next_shape)
+
+
+class PlacementHints:
+    """Suggested placement for the falling piece, searched in a worker
+    process.
+
+    update() is called every tick and never waits. The first call starts
+    the worker from a background thread, since spawning a process takes
+    longer than a frame. Once the worker is up, update() hands it a copy
+    of the board when a new piece spawns and picks the answer up once it
+    is ready. Answers for a piece that has already locked are dropped. A
+    process is used instead of a thread so the search never holds the GIL
+    the game loop needs.
+    """
+
+    def __init__(self, width, height):
+        self.W, self.H = width, height
+        self.executor = None
+        # Thread spawning the worker, the executor is set once it is up
+        self.starter = None
+        self.failed = False
+        self.pending = None
+        self.pending_id = None
+        # Piece the hint is for and its suggested (rotation, x, y)
+        self.piece_id = None
+        self.placement = None
+
+    def update(self, engine):
+        if self.executor is None:
+            # The current piece gets its hint once the worker is up
+            self.start()
+            return
+        piece_id = (engine.seed, engine.pieces)
+        if piece_id != self.piece_id:
+            self.piece_id = piece_id
+            self.placement = None
+            self.request(engine)
+
+        if self.pending is not None and self.pending.done():
+            future, self.pending = self.pending, None
+            # The piece may have locked while the worker was busy
+            if self.pending_id == self.piece_id and future.exception() is None:
+                self.placement = future.result()
+
+    def start(self):
+        """Spawn the worker process in the background, if not done yet"""
+        if self.failed or self.starter is not None:
+            return
+        self.starter = threading.Thread(target=self._spawn, daemon=True)
+        self.starter.start()
+
+    def _spawn(self):
+        executor = None
+        try:
+            executor = ProcessPoolExecutor(max_workers=1,
+                                           initializer=_start_worker)
+            # The pool only spawns its process on the first submit
+            executor.submit(_ready).result()
+        except (BrokenProcessPool, OSError, RuntimeError) as e:
+            # Hints are optional, the game goes on without them
+            print(f"Error starting hint worker: {e}")
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            self.failed = True
+            return
+        self.executor = executor
+
+    def request(self, engine):
+        # A search still running for the previous piece is left to finish,
+        # its result is ignored
+        try:
+            self.pending = self.executor.submit(
+                suggest, tuple(engine.board.rows), engine.shape,
+                engine.next_shape, self.W, self.H)
+            self.pending_id = self.piece_id
+        except (BrokenProcessPool, RuntimeError) as e:
+            self.fail(e)
+
+    def fail(self, error):
+        # Hints are optional, the game goes on without them
+        print(f"Error starting hint worker: {error}")
+        self.close()
+        self.failed = True
+
+    def cells(self, shape):
+        """Yield the board cells of the suggested placement, if any"""
+        if self.placement is None:
+            return
+        rotation, x, y = self.placement
+        for dx, dy in ROTATIONS[shape][rotation]:
+            yield x + dx, y + dy
+
+    def close(self):
+        """Stop the worker, waiting for a search it is running"""
+        if self.starter is not None:
+            self.starter.join()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        self.pending = None
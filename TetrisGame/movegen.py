@@ -0,0 +1,160 @@
+import argparse
+import time
+from collections import deque
+from TetrisGame.pieces import ROTATIONS, NUM_SHAPES, NUM_ROTATIONS, spawn_position
+from TetrisGame.tetris_engine import TetrisEngine
+
+
+def _rotation_mask(offsets):
+    """Row masks of a rotation state, shifted so its leftmost column is bit 0"""
+    min_dx = min(dx for dx, dy in offsets)
+    max_dx = max(dx for dx, dy in offsets)
+    min_dy = min(dy for dx, dy in offsets)
+    rows = {}
+    for dx, dy in offsets:
+        rows[dy] = rows.get(dy, 0) | 1 << (dx - min_dx)
+    cells = tuple(sorted(rows.items()))
+    # Same cells relative to the top left corner, equal for rotation
+    # states that only differ by where their center is
+    pattern = tuple((dy - min_dy, bits) for dy, bits in cells)
+    return min_dx, max_dx, min_dy, cells, pattern
+
+
+# MASKS[shape][rotation] -> (min_dx, max_dx, min_dy, ((dy, bits), ...), pattern)
+MASKS = tuple(tuple(_rotation_mask(offsets) for offsets in ROTATIONS[shape])
+              for shape in range(NUM_SHAPES))
+
+
+def collides(rows, width, height, mask, x, y):
+    """Board.collides for a row mask list and a rotation mask"""
+    min_dx, max_dx, _, cells, _ = mask
+    if x + min_dx < 0 or x + max_dx >= width:
+        return True
+    shift = x + min_dx
+    for dy, bits in cells:
+        row = y + dy
+        if row >= height:
+            return True
+        # Cells above the top edge are free
+        if row >= 0 and rows[row] & (bits << shift):
+            return True
+    return False
+
+
+def reachable_placements(rows, shape, width, height, start=None):
+    """Every lock position (rotation, x, y) a piece can reach from start
+    (the spawn state by default) with single shifts, rotations and soft
+    drops, like TetrisEngine.step moves it.
+
+    States are searched breadth first and placements that cover the same
+    cells through different rotation states are only returned once.
+    """
+    masks = MASKS[shape]
+    if start is None:
+        start = (0, *spawn_position(shape, width))
+    if collides(rows, width, height, masks[start[0]], start[1], start[2]):
+        return []
+
+    seen = {start}
+    queue = deque([start])
+    landed = set()
+    placements = []
+    while queue:
+        state = queue.popleft()
+        rotation, x, y = state
+        mask = masks[rotation]
+
+        # Soft drop, or lock when the piece is resting on something
+        if collides(rows, width, height, mask, x, y + 1):
+            min_dx, _, min_dy, _, pattern = mask
+            cells = (pattern, x + min_dx, y + min_dy)
+            if cells not in landed:
+                landed.add(cells)
+                placements.append(state)
+        else:
+            below = (rotation, x, y + 1)
+            if below not in seen:
+                seen.add(below)
+                queue.append(below)
+
+        # Shift left and right
+        for dx in (-1, 1):
+            moved = (rotation, x + dx, y)
+            if moved not in seen:
+                seen.add(moved)
+                if not collides(rows, width, height, mask, x + dx, y):
+                    queue.append(moved)
+
+        # Rotate
+        next_rotation = (rotation + 1) % NUM_ROTATIONS
+        turned = (next_rotation, x, y)
+        if turned not in seen:
+            seen.add(turned)
+            if not collides(rows, width, height, masks[next_rotation], x, y):
+                queue.append(turned)
+    return placements
+
+
+def lock(rows, width, shape, rotation, x, y):
+    """Board rows after locking the piece there and clearing full lines.
+    Returns (rows, lines)."""
+    min_dx, _, _, cells, _ = MASKS[shape][rotation]
+    new_rows = list(rows)
+    shift = x + min_dx
+    for dy, bits in cells:
+        # Cells still above the top edge are lost
+        if y + dy >= 0:
+            new_rows[y + dy] |= bits << shift
+    full_row = (1 << width) - 1
+    kept = [row for row in new_rows if row != full_row]
+    lines = len(new_rows) - len(kept)
+    if lines:
+        new_rows = [0] * lines + kept
+    return new_rows, lines
+
+
+def perft(rows, shapes, depth, width, height):
+    """Number of placement sequences of shapes[:depth] from the board.
+    Sequences that top out end early and count as one leaf."""
+    placements = reachable_placements(rows, shapes[0], width, height)
+    if depth == 1:
+        return len(placements)
+    nodes = 0
+    for rotation, x, y in placements:
+        child, _ = lock(rows, width, shapes[0], rotation, x, y)
+        if child[0]:
+            nodes += 1
+        else:
+            nodes += perft(child, shapes[1:], depth - 1, width, height)
+    return nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Count Tetris placement sequences to a depth (perft)")
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0,
+                        help="game seed the piece sequence is taken from")
+    parser.add_argument('--width', type=int, default=10)
+    parser.add_argument('--height', type=int, default=15)
+    args = parser.parse_args()
+
+    # The same pieces a game with this seed would deal
+    engine = TetrisEngine(1, 0, width=args.width, height=args.height,
+                          seed=args.seed)
+    shapes = [engine.shape]
+    for _ in range(args.depth - 1):
+        shapes.append(engine.next_shape)
+        engine.spawn_piece()
+
+    rows = [0] * args.height
+    for depth in range(1, args.depth + 1):
+        start = time.perf_counter()
+        nodes = perft(rows, shapes, depth, args.width, args.height)
+        elapsed = time.perf_counter() - start
+        print(f"depth {depth}: {nodes:>12,} nodes {elapsed:>8.3f} s "
+              f"{nodes / elapsed:>12,.0f} nodes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,679 @@
+import argparse
+import collections
+import os
+import random
+import selectors
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+import pygame
+
+# Make the TetrisGame package importable when running from this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from TetrisGame.board import Board
+from TetrisGame.pieces import ROTATIONS, NUM_ROTATIONS
+from TetrisGame.tetris_engine import TICK_RATE, LEFT, RIGHT, ROTATE, SOFT_DROP
+from TetrisGame.difficulty import DIFFICULTY_PROFILES
+from TetrisGame.versus import VersusMatch, VersusScene, KEYMAPS
+
+# Every message is a frame: payload length then payload. Server frames are
+# one zlib stream per connection, so rows and colors sent before make the
+# later updates smaller. The sync flush tail every frame ends with is left
+# out and put back by the client.
+_FRAME = struct.Struct('<H')
+_SYNC_TAIL = b'\x00\x00\xff\xff'
+
+# Client -> server: one input of the player, numbered so the client knows
+# which of its inputs the server has applied
+INPUT = b'I'
+_INPUT = struct.Struct('<IB')
+
+# Server -> client
+WELCOME = b'W'   # _WELCOME: your board, local players, boards, width, height
+ROUND = b'R'     # _ROUND: a new round starts on empty boards
+UPDATE = b'U'    # _TICK, then _BOARD records of the boards that changed
+END = b'E'       # _END: the winning board, -1 when nobody is left
+_WELCOME = struct.Struct('<BBBHH')
+_ROUND = struct.Struct('<I')
+_TICK = struct.Struct('<I')
+_END = struct.Struct('<b')
+
+# Board record: board index and which of the parts below follow, in order
+_BOARD = struct.Struct('<BB')
+PIECE = 1    # _PIECE: shape, rotation, x, y, color
+ACK = 2      # _ACK: last input of the board's player the server applied
+ROWS = 4     # _COUNT, then per row _ROW_Y, the row mask and the colors of
+             # its filled cells
+STATUS = 8   # _STATUS: lines, incoming garbage, game over
+_PIECE = struct.Struct('<BBhh3B')
+_ACK = struct.Struct('<I')
+_COUNT = struct.Struct('<H')
+_ROW_Y = struct.Struct('<H')
+_STATUS = struct.Struct('<IH?')
+
+# Ticks between two updates sent to the clients
+SEND_INTERVAL = 3
+# Ticks between the end of a round and the next one
+ROUND_DELAY = 3 * TICK_RATE
+# Inputs a client can have waiting on the server
+MAX_QUEUED_INPUTS = 60
+
+
+def _read_frames(buffer):
+    """Yield the complete frames in buffer and remove them from it"""
+    pos = 0
+    while len(buffer) - pos >= _FRAME.size:
+        size, = _FRAME.unpack_from(buffer, pos)
+        end = pos + _FRAME.size + size
+        if end > len(buffer):
+            break
+        yield bytes(buffer[pos + _FRAME.size:end])
+        pos = end
+    del buffer[:pos]
+
+
+class Connection:
+    """One client on the server side, with its own outgoing zlib stream
+    and the inputs it sent that are not applied yet"""
+
+    def __init__(self, sock, player):
+        self.sock = sock
+        self.player = player
+        self.received = bytearray()
+        self.outgoing = bytearray()
+        self.compressor = zlib.compressobj(9)
+        self.inputs = collections.deque(maxlen=MAX_QUEUED_INPUTS)
+        self.acked = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.closed = False
+
+    def send(self, payload):
+        data = (self.compressor.compress(payload)
+                + self.compressor.flush(zlib.Z_SYNC_FLUSH))[:-len(_SYNC_TAIL)]
+        self.outgoing += _FRAME.pack(len(data)) + data
+
+    def flush(self):
+        """Send what the socket takes without blocking, the rest waits for
+        the next flush"""
+        if self.closed or not self.outgoing:
+            return
+        try:
+            sent = self.sock.send(self.outgoing)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.closed = True
+            return
+        del self.outgoing[:sent]
+        self.bytes_out += sent
+
+    def read(self):
+        """Queue the inputs that arrived, returns False once the client
+        is gone"""
+        try:
+            data = self.sock.recv(4096)
+        except BlockingIOError:
+            return True
+        except OSError:
+            data = b''
+        if not data:
+            self.closed = True
+            return False
+        self.bytes_in += len(data)
+        self.received += data
+        for frame in _read_frames(self.received):
+            if frame[:1] == INPUT and len(frame) == 1 + _INPUT.size:
+                self.inputs.append(_INPUT.unpack_from(frame, 1))
+        return True
+
+
+class _SentBoard:
+    """What the clients know about one board, to send only the changes"""
+
+    def __init__(self, height):
+        self.piece = None
+        self.ack = 0
+        self.board_key = None
+        self.rows = [0] * height
+        self.colors = [[] for _ in range(height)]
+        self.status = (0, 0, False)
+
+
+class VersusServer:
+    """Authoritative versus server for network players plus bots.
+
+    The server runs the only real game, at TICK_RATE. Clients send their
+    inputs only, the server applies one queued input per player and tick
+    and every SEND_INTERVAL ticks sends each client the changes since the
+    last update: the falling pieces, the rows that changed when a piece
+    locked or garbage rose, and board status. A round starts once
+    `players` clients have connected, the next one ROUND_DELAY ticks after
+    a board won.
+    """
+
+    def __init__(self, host='127.0.0.1', port=5555, players=2, bots=0,
+                 difficulty='medium', width=10, height=15, seed=None):
+        self.match = VersusMatch(players, bots, difficulty, width, height, seed)
+        self.players = players
+        self.row_bytes = (width + 7) // 8
+        self.listener = socket.create_server((host, port))
+        self.listener.setblocking(False)
+        self.address = self.listener.getsockname()
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.connections = []
+        self.ticks = 0
+        self.round = 0
+        self.round_over_tick = None
+
+    def accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        if len(self.connections) == self.players:
+            sock.close()
+            return
+        sock.setblocking(False)
+        # Inputs and updates are tiny, send them right away
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = Connection(sock, len(self.connections))
+        self.connections.append(connection)
+        self.selector.register(sock, selectors.EVENT_READ, connection)
+        if len(self.connections) == self.players:
+            self.start_round()
+
+    @property
+    def started(self):
+        return len(self.connections) == self.players
+
+    def start_round(self):
+        match = self.match
+        if self.round:
+            match.new_round()
+        self.round += 1
+        self.round_over_tick = None
+        self.sent = [_SentBoard(engine.H) for engine in match.engines]
+        engine = match.engines[0]
+        for connection in self.connections:
+            if self.round == 1:
+                connection.send(WELCOME + _WELCOME.pack(
+                    connection.player, self.players, len(match.engines),
+                    engine.W, engine.H))
+            connection.send(ROUND + _ROUND.pack(self.round))
+
+    def serve(self, seconds=None):
+        """Run the game until `seconds` have passed or every client left"""
+        start = next_tick = time.perf_counter()
+        while seconds is None or time.perf_counter() - start < seconds:
+            timeout = max(0.0, next_tick - time.perf_counter())
+            for key, _ in self.selector.select(timeout):
+                if key.data is None:
+                    self.accept()
+                elif not key.data.read():
+                    self.drop(key.data)
+
+            now = time.perf_counter()
+            if now < next_tick:
+                continue
+            # Catch up after a stall, but never by more than a few ticks
+            next_tick = max(next_tick + 1 / TICK_RATE, now - 5 / TICK_RATE)
+            if self.started:
+                if all(connection.closed for connection in self.connections):
+                    return
+                self.tick()
+            for connection in self.connections:
+                connection.flush()
+
+    def tick(self):
+        match = self.match
+        for connection in self.connections:
+            if connection.inputs:
+                connection.acked, action = connection.inputs.popleft()
+                match.actions[connection.player] = action
+        match.update()
+        self.ticks += 1
+
+        if match.winner is not None and self.round_over_tick is None:
+            self.round_over_tick = self.ticks
+            self.broadcast_update()
+            self.broadcast(END + _END.pack(match.winner))
+        elif (self.round_over_tick is not None
+                and self.ticks - self.round_over_tick >= ROUND_DELAY):
+            self.start_round()
+            self.broadcast_update()
+        elif self.ticks % SEND_INTERVAL == 0:
+            self.broadcast_update()
+
+    def broadcast(self, payload):
+        for connection in self.connections:
+            if not connection.closed:
+                connection.send(payload)
+
+    def broadcast_update(self):
+        records = []
+        for i, engine in enumerate(self.match.engines):
+            records += self.encode_board(i, engine, self.sent[i])
+        if records:
+            self.broadcast(UPDATE + _TICK.pack(self.ticks) + b''.join(records))
+
+    def encode_board(self, i, engine, sent):
+        """Record of what changed on board i since the last update, if
+        anything did"""
+        flags = 0
+        parts = []
+        piece = (engine.shape, engine.rotation, engine.piece_x, engine.piece_y,
+                 *engine.color)
+        if piece != sent.piece:
+            sent.piece = piece
+            flags |= PIECE
+            parts.append(_PIECE.pack(*piece))
+
+        if i < self.players:
+            ack = self.connections[i].acked
+            if ack != sent.ack:
+                sent.ack = ack
+                flags |= ACK
+                parts.append(_ACK.pack(ack))
+
+        # Rows only change when a piece locks
+        board_key = (engine.seed, engine.pieces)
+        if board_key != sent.board_key:
+            sent.board_key = board_key
+            board = engine.board
+            colors = [board.row_colors(y) for y in range(engine.H)]
+            changed = [y for y in range(engine.H) if board.rows[y] != sent.rows[y]
+                       or colors[y] != sent.colors[y]]
+            if changed:
+                flags |= ROWS
+                parts.append(_COUNT.pack(len(changed)))
+                for y in changed:
+                    row = board.rows[y]
+                    sent.rows[y], sent.colors[y] = row, colors[y]
+                    parts.append(_ROW_Y.pack(y) + row.to_bytes(self.row_bytes, 'little'))
+                    parts.append(b''.join(bytes(color) for color in colors[y]))
+
+        status = (engine.lines, min(engine.pending_garbage, 0xFFFF), engine.game_over)
+        if status != sent.status:
+            sent.status = status
+            flags |= STATUS
+            parts.append(_STATUS.pack(*status))
+
+        if not flags:
+            return []
+        return [_BOARD.pack(i, flags)] + parts
+
+    def drop(self, connection):
+        """A client left, its board is out of the round"""
+        self.selector.unregister(connection.sock)
+        connection.sock.close()
+        connection.closed = True
+        self.match.engines[connection.player].game_over = True
+
+    def close(self):
+        """Send the last changes, then disconnect everybody"""
+        if self.started:
+            self.broadcast_update()
+        for connection in self.connections:
+            # Clients that left are dropped already
+            if connection.sock.fileno() != -1:
+                connection.sock.setblocking(True)
+                connection.flush()
+                self.selector.unregister(connection.sock)
+                connection.sock.close()
+                connection.closed = True
+        self.selector.close()
+        self.listener.close()
+
+
+class RemoteBoard:
+    """Client side copy of one board. It has the engine attributes a
+    BoardView draws, so remote boards are drawn like local ones."""
+
+    def __init__(self, width, height):
+        self.W, self.H = width, height
+        self.board = Board(width, height)
+        self.reset(0)
+
+    def reset(self, round_number):
+        self.board.reset()
+        # Same role as the engine's (seed, pieces): it changes whenever
+        # the locked cells do
+        self.seed, self.pieces = round_number, 0
+        self.shape, self.rotation, self.piece_x, self.piece_y = 0, 0, 0, -4
+        self.color = (0, 0, 0)
+        # Piece state as the server last sent it, before prediction
+        self.server_piece = (0, 0, 0, -4)
+        self.ack = 0
+        self.lines, self.pending_garbage, self.game_over = 0, 0, False
+
+    def piece_cells(self):
+        x, y = self.piece_x, self.piece_y
+        for dx, dy in ROTATIONS[self.shape][self.rotation]:
+            yield x + dx, y + dy
+
+    def predict(self, actions):
+        """Show the server's piece moved by inputs the server has not
+        applied yet, with the same moves and rotations as step(). Falling
+        is left to the server."""
+        shape, rotation, x, y = self.server_piece
+        offsets = ROTATIONS[shape]
+        collides = self.board.collides
+        for action in actions:
+            dx = ((action & RIGHT) >> 1) - (action & LEFT)
+            if dx and not collides(offsets[rotation], x + dx, y):
+                x += dx
+            if action & ROTATE:
+                next_rotation = (rotation + 1) % NUM_ROTATIONS
+                if not collides(offsets[next_rotation], x, y):
+                    rotation = next_rotation
+        self.shape, self.rotation, self.piece_x, self.piece_y = shape, rotation, x, y
+
+
+class NetClient:
+    """Connection to a VersusServer. poll() applies the server's updates to
+    one RemoteBoard per board, send_input() sends an input and moves the
+    player's own piece right away, before the server confirms it."""
+
+    def __init__(self, host='127.0.0.1', port=5555, timeout=10):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.received = bytearray()
+        self.decompressor = zlib.decompressobj()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.boards = None
+        self.round = 0
+        self.winner = None
+        self.connected = True
+        self.seq = 0
+        # Inputs sent but not applied by the server yet: (seq, action, time)
+        self.pending = collections.deque()
+        # Seconds from sending an input to the server confirming it
+        self.ack_times = []
+
+        # The round starts once every player has connected
+        while self.boards is None and self.connected:
+            self.receive()
+        if self.boards is None:
+            raise ConnectionError("Server closed the connection before the game started")
+        self.sock.setblocking(False)
+
+    @property
+    def own_board(self):
+        return self.boards[self.player]
+
+    def send_input(self, action):
+        if not action or not self.connected:
+            return
+        self.seq += 1
+        self.pending.append((self.seq, action, time.perf_counter()))
+        data = INPUT + _INPUT.pack(self.seq, action)
+        try:
+            self.sock.sendall(_FRAME.pack(len(data)) + data)
+        except OSError:
+            self.connected = False
+            return
+        self.bytes_out += _FRAME.size + len(data)
+        self.own_board.predict(a for _, a, _ in self.pending)
+
+    def poll(self):
+        """Apply everything the server sent since the last poll"""
+        while self.connected and self.receive():
+            pass
+
+    def receive(self):
+        """Read once from the socket, returns whether anything came"""
+        try:
+            data = self.sock.recv(65536)
+        except (BlockingIOError, socket.timeout):
+            return False
+        except OSError:
+            data = b''
+        if not data:
+            self.connected = False
+            return False
+        self.bytes_in += len(data)
+        self.received += data
+        for frame in _read_frames(self.received):
+            self.handle(self.decompressor.decompress(frame + _SYNC_TAIL))
+        return True
+
+    def handle(self, message):
+        kind, body = message[:1], memoryview(message)[1:]
+        if kind == WELCOME:
+            self.player, self.players, count, width, height = _WELCOME.unpack_from(body)
+            self.boards = [RemoteBoard(width, height) for _ in range(count)]
+        elif kind == ROUND:
+            self.round, = _ROUND.unpack_from(body)
+            self.winner = None
+            self.pending.clear()
+            for board in self.boards:
+                board.reset(self.round)
+        elif kind == END:
+            self.winner, = _END.unpack_from(body)
+        elif kind == UPDATE:
+            self.apply_update(body)
+
+    def apply_update(self, body):
+        pos = _TICK.size
+        row_bytes = (self.boards[0].W + 7) // 8
+        while pos < len(body):
+            i, flags = _BOARD.unpack_from(body, pos)
+            pos += _BOARD.size
+            board = self.boards[i]
+            if flags & PIECE:
+                shape, rotation, x, y, *color = _PIECE.unpack_from(body, pos)
+                pos += _PIECE.size
+                board.server_piece = (shape, rotation, x, y)
+                board.color = tuple(color)
+                board.shape, board.rotation, board.piece_x, board.piece_y = board.server_piece
+            if flags & ACK:
+                board.ack, = _ACK.unpack_from(body, pos)
+                pos += _ACK.size
+            if flags & ROWS:
+                count, = _COUNT.unpack_from(body, pos)
+                pos += _COUNT.size
+                changes = []
+                for _ in range(count):
+                    y, = _ROW_Y.unpack_from(body, pos)
+                    pos += _ROW_Y.size
+                    row = int.from_bytes(body[pos:pos + row_bytes], 'little')
+                    pos += row_bytes
+                    colors = []
+                    for _ in range(bin(row).count('1')):
+                        colors.append(tuple(body[pos:pos + 3]))
+                        pos += 3
+                    changes.append((y, row, colors))
+                board.board.set_rows(changes)
+                board.pieces += 1
+            if flags & STATUS:
+                board.lines, board.pending_garbage, board.game_over = \
+                    _STATUS.unpack_from(body, pos)
+                pos += _STATUS.size
+
+        # Drop the inputs the server has applied, the rest still move the
+        # player's piece on top of the server's state
+        own = self.own_board
+        now = time.perf_counter()
+        while self.pending and self.pending[0][0] <= own.ack:
+            self.ack_times.append(now - self.pending.popleft()[2])
+        own.predict(action for _, action, _ in self.pending)
+
+    def close(self):
+        self.connected = False
+        self.sock.close()
+
+
+class NetVersusScene(VersusScene):
+    """Versus against other players through a VersusServer. Only the arrow
+    keys are sent, the server decides everything else."""
+
+    ROUND_OVER_TEXT = "Next round soon"
+
+    def __init__(self, game_state=None, host='127.0.0.1', port=5555):
+        self.game_state = game_state
+        self.client = NetClient(host, port)
+        client = self.client
+        labels = []
+        for i in range(len(client.boards)):
+            if i == client.player:
+                labels.append("YOU")
+            elif i < client.players:
+                labels.append(f"P{i + 1}")
+            else:
+                labels.append(f"BOT {i - client.players + 1}")
+        board = client.boards[0]
+        self.layout(client.boards, labels, board.W, board.H)
+        self.round = client.round
+
+    @property
+    def winner(self):
+        return self.client.winner
+
+    def handle_events(self, event):
+        if event.type == pygame.KEYDOWN and event.key in KEYMAPS[0]:
+            self.client.send_input(KEYMAPS[0][event.key])
+
+    def update(self):
+        self.client.poll()
+        if self.client.round != self.round:
+            self.round = self.client.round
+            self.full_redraw = True
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def loopback(clients, bots, difficulty, width, height, seconds, seed):
+    """Play a game between a server thread and headless clients pressing
+    random keys over loopback, then check every client ended up with the
+    server's boards and print what it cost"""
+    server = VersusServer('127.0.0.1', 0, clients, bots, difficulty, width,
+                          height, seed)
+    thread = threading.Thread(target=server.serve, args=(seconds,), daemon=True)
+    thread.start()
+    host, port = server.address
+    players = []
+    connections = []
+    for _ in range(clients):
+        # The server only accepts between ticks, connect in the background
+        # so the last connection does not block the others
+        connections.append(threading.Thread(
+            target=lambda: players.append(NetClient(host, port))))
+    for connection in connections:
+        connection.start()
+    for connection in connections:
+        connection.join()
+
+    # About one key every 8 ticks, a quick human player
+    rng = random.Random(seed)
+    keys = (LEFT, RIGHT, ROTATE, SOFT_DROP)
+    start = time.perf_counter()
+    while thread.is_alive():
+        for player in players:
+            if rng.random() < 1 / 8:
+                player.send_input(rng.choice(keys))
+            player.poll()
+        time.sleep(1 / TICK_RATE)
+    thread.join()
+    server.close()
+    elapsed = time.perf_counter() - start
+    for player in players:
+        player.sock.setblocking(True)
+        while player.connected:
+            player.receive()
+
+    mismatches = 0
+    for player in players:
+        for engine, board in zip(server.match.engines, player.boards):
+            if (board.board.rows != engine.board.rows
+                    or list(board.board.filled_cells())
+                    != list(engine.board.filled_cells())
+                    or board.lines != engine.lines
+                    or board.game_over != engine.game_over
+                    or (board.shape, board.rotation, board.piece_x, board.piece_y)
+                    != (engine.shape, engine.rotation, engine.piece_x, engine.piece_y)):
+                mismatches += 1
+
+    print(f"{server.round} rounds, {server.ticks} ticks in {elapsed:.1f} s, "
+          f"{mismatches} boards differ from the server")
+    for player in players:
+        acks = player.ack_times or [0]
+        print(f"player {player.player + 1}: {player.seq} inputs, "
+              f"down {player.bytes_in / elapsed:.0f} B/s, "
+              f"up {player.bytes_out / elapsed:.0f} B/s, input confirmed after "
+              f"p50 {percentile(acks, 0.5) * 1000:.1f} ms, "
+              f"p99 {percentile(acks, 0.99) * 1000:.1f} ms")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Versus Tetris over the network")
+    commands = parser.add_subparsers(dest='command', required=True)
+    server_parser = commands.add_parser('server', help="host a game")
+    client_parser = commands.add_parser('client', help="join a game")
+    loopback_parser = commands.add_parser(
+        'loopback', help="server and headless clients in one process")
+    for command in (server_parser, client_parser):
+        command.add_argument('--host', default='127.0.0.1')
+        command.add_argument('--port', type=int, default=5555)
+    for command in (server_parser, loopback_parser):
+        command.add_argument('--bots', type=int, default=0)
+        command.add_argument('--difficulty', choices=list(DIFFICULTY_PROFILES),
+                             default='medium')
+        command.add_argument('--width', type=int, default=10)
+        command.add_argument('--height', type=int, default=15)
+        command.add_argument('--seed', type=int)
+    server_parser.add_argument('--players', type=int, default=2)
+    loopback_parser.add_argument('--clients', type=int, default=2)
+    loopback_parser.add_argument('--seconds', type=float, default=20)
+    args = parser.parse_args()
+
+    if args.command == 'server':
+        server = VersusServer(args.host, args.port, args.players, args.bots,
+                              args.difficulty, args.width, args.height, args.seed)
+        print(f"Waiting for {args.players} players on port {server.address[1]}")
+        try:
+            server.serve()
+        except KeyboardInterrupt:
+            pass
+        server.close()
+        return
+    if args.command == 'loopback':
+        seed = 0 if args.seed is None else args.seed
+        mismatches = loopback(args.clients, args.bots, args.difficulty,
+                              args.width, args.height, args.seconds, seed)
+        sys.exit(1 if mismatches else 0)
+
+    pygame.init()
+    screen = pygame.display.set_mode(VersusScene.RES)
+    pygame.display.set_caption("TETRIS VERSUS")
+    try:
+        scene = NetVersusScene(None, args.host, args.port)
+    except OSError as e:
+        print(f"Error connecting to server: {e}")
+        pygame.quit()
+        return
+
+    clock = pygame.time.Clock()
+    while scene.client.connected:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                scene.client.close()
+                break
+            scene.handle_events(event)
+        scene.update()
+        pygame.display.update(scene.render(screen))
+        clock.tick(TICK_RATE)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# Cell positions of each figure around the spawn point. The first cell of
+# each figure is the rotation center.
+FIGURES_POS = [[(-1, 0), (-2, 0), (0, 0), (1, 0)],
+               [(0, -1), (-1, -1), (-1, 0), (0, 0)],
+               [(-1, 0), (-1, 1), (0, 0), (0, -1)],
+               [(0, 0), (-1, 0), (0, 1), (-1, -1)],
+               [(0, 0), (0, -1), (0, 1), (-1, -1)],
+               [(0, 0), (0, -1), (0, 1), (1, -1)],
+               [(0, 0), (0, -1), (0, 1), (-1, 0)]]
+
+
+def _build_rotations(fig_pos):
+    """Precompute the cell offsets of all four rotation states of a figure"""
+    cx, cy = fig_pos[0]
+    offsets = tuple((x - cx, y - cy) for x, y in fig_pos)
+    states = [offsets]
+    for _ in range(3):
+        # Quarter turn around the center cell: (dx, dy) -> (-dy, dx)
+        offsets = tuple((-dy, dx) for dx, dy in offsets)
+        states.append(offsets)
+    return tuple(states)
+
+
+# ROTATIONS[shape][rotation] -> offsets of the four cells from the center
+ROTATIONS = tuple(_build_rotations(fig_pos) for fig_pos in FIGURES_POS)
+NUM_SHAPES = len(ROTATIONS)
+NUM_ROTATIONS = 4
+
+
+def spawn_position(shape, width):
+    """Board position of the center cell of a newly spawned figure"""
+    cx, cy = FIGURES_POS[shape][0]
+    return cx + width // 2, cy + 1
@@ -0,0 +1,206 @@
+import argparse
+import bisect
+import struct
+import time
+import zlib
+from TetrisGame.tetris_engine import TetrisEngine, NOOP
+
+# Replay file layout:
+#   header (_HEADER): magic, version, engine settings and game seed
+#   zlib body: input events as (tick delta varint, action byte) pairs,
+#              then keyframes as (tick delta varint, size varint, snapshot)
+MAGIC = b'TRPL'
+VERSION = 2
+_HEADER = struct.Struct('<4sBQddddHHHI')
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value, shift = 0, 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class ReplayRecorder:
+    """Records one game as its seed, the non-empty inputs of every tick and
+    a snapshot of the engine every keyframe_interval ticks"""
+
+    def __init__(self, engine, keyframe_interval=1800):
+        self.engine = engine
+        self.keyframe_interval = keyframe_interval
+        self.start()
+
+    def start(self):
+        """Begin recording the game the engine was just reset to"""
+        engine = self.engine
+        self.seed = engine.seed
+        self.settings = (engine.start_gravity, engine.gravity_increase,
+                         engine.lock_gravity, engine.soft_drop_factor,
+                         engine.W, engine.H, engine.tick_rate)
+        self.events = bytearray()
+        # Tick and start offset of every event, to truncate on rewind
+        self.event_ticks = []
+        self.event_offsets = []
+        self.last_event_tick = 0
+        self.keyframes = []
+        self.ticks = 0
+
+    def record(self, action):
+        """Call right before engine.step(action)"""
+        tick = self.engine.ticks
+        if tick and tick % self.keyframe_interval == 0:
+            self.keyframes.append((tick, self.engine.snapshot()))
+        if action:
+            self.event_ticks.append(tick)
+            self.event_offsets.append(len(self.events))
+            _write_varint(self.events, tick - self.last_event_tick)
+            self.events.append(action)
+            self.last_event_tick = tick
+        self.ticks = tick + 1
+
+    def truncate(self, tick):
+        """Forget everything from `tick` on, after the engine was rewound
+        to that tick"""
+        i = bisect.bisect_left(self.event_ticks, tick)
+        if i < len(self.event_ticks):
+            del self.events[self.event_offsets[i]:]
+            del self.event_ticks[i:]
+            del self.event_offsets[i:]
+        self.last_event_tick = self.event_ticks[-1] if self.event_ticks else 0
+        k = bisect.bisect_left([t for t, _ in self.keyframes], tick)
+        del self.keyframes[k:]
+        self.ticks = min(self.ticks, tick)
+
+    def to_bytes(self):
+        body = bytearray()
+        _write_varint(body, len(self.event_ticks))
+        body += self.events
+        _write_varint(body, len(self.keyframes))
+        last_tick = 0
+        for tick, snapshot in self.keyframes:
+            _write_varint(body, tick - last_tick)
+            _write_varint(body, len(snapshot))
+            body += snapshot
+            last_tick = tick
+        header = _HEADER.pack(MAGIC, VERSION, self.seed, *self.settings,
+                              self.ticks)
+        return header + zlib.compress(bytes(body), 9)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+
+class Replay:
+    """A recorded game that can be re-simulated headless from any tick"""
+
+    def __init__(self, data):
+        (magic, version, self.seed, gravity, gravity_increase, lock_gravity,
+         soft_drop_factor, width, height, tick_rate,
+         self.ticks) = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a Tetris replay file")
+        self.settings = {
+            'gravity': gravity,
+            'gravity_increase': gravity_increase,
+            'lock_gravity': lock_gravity,
+            'soft_drop_factor': soft_drop_factor,
+            'width': width,
+            'height': height,
+            'tick_rate': tick_rate,
+        }
+
+        body = zlib.decompress(data[_HEADER.size:])
+        count, pos = _read_varint(body, 0)
+        self.event_ticks, self.event_actions = [], []
+        tick = 0
+        for _ in range(count):
+            delta, pos = _read_varint(body, pos)
+            tick += delta
+            self.event_ticks.append(tick)
+            self.event_actions.append(body[pos])
+            pos += 1
+
+        count, pos = _read_varint(body, pos)
+        self.keyframe_ticks, self.keyframes = [], []
+        tick = 0
+        for _ in range(count):
+            delta, pos = _read_varint(body, pos)
+            size, pos = _read_varint(body, pos)
+            tick += delta
+            self.keyframe_ticks.append(tick)
+            self.keyframes.append(body[pos:pos + size])
+            pos += size
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def engine_at(self, tick):
+        """Engine in the state it had after `tick` ticks of the game.
+
+        The closest keyframe at or before the tick is found by bisection,
+        so at most one keyframe interval is re-simulated.
+        """
+        tick = min(tick, self.ticks)
+        engine = TetrisEngine(**self.settings, seed=self.seed)
+        start = 0
+        k = bisect.bisect_right(self.keyframe_ticks, tick) - 1
+        if k >= 0:
+            start = self.keyframe_ticks[k]
+            engine.restore(self.keyframes[k])
+
+        event_ticks, event_actions = self.event_ticks, self.event_actions
+        i = bisect.bisect_left(event_ticks, start)
+        for current in range(start, tick):
+            action = NOOP
+            if i < len(event_ticks) and event_ticks[i] == current:
+                action = event_actions[i]
+                i += 1
+            engine.step(action)
+        return engine
+
+    def run(self):
+        """Re-simulate the whole game and return the final engine"""
+        return self.engine_at(self.ticks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a Tetris replay")
+    parser.add_argument('path')
+    parser.add_argument('--tick', type=int,
+                        help="show the game state after this many ticks")
+    args = parser.parse_args()
+
+    with open(args.path, 'rb') as f:
+        data = f.read()
+    replay = Replay(data)
+    seconds = replay.ticks / replay.settings['tick_rate']
+    print(f"{len(data)} bytes, {replay.ticks} ticks ({seconds:.0f} s), "
+          f"{len(replay.event_ticks)} inputs, {len(replay.keyframes)} keyframes")
+
+    tick = replay.ticks if args.tick is None else args.tick
+    start = time.perf_counter()
+    engine = replay.engine_at(tick)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"tick {tick}: score {engine.score}, lines {engine.lines}, "
+          f"pieces {engine.pieces} ({elapsed:.1f} ms)")
+    for row in engine.board.rows:
+        print(''.join('#' if (row >> x) & 1 else '.'
+                      for x in range(engine.W)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import struct
+
+# Board slot index stored after the engine state of every tick
+_BOARD_INDEX = struct.Struct('<I')
+
+
+class RewindBuffer:
+    """The last `capacity` ticks of a game in preallocated ring buffers.
+
+    Every record() packs the engine state into the next fixed-size slot of
+    one bytearray, so recording a tick allocates nothing. The board only
+    changes when a piece locks, so it goes into a second ring of board
+    slots only then, and each tick slot keeps the index of its board.
+    Rewinding is index arithmetic plus one restore whatever the history
+    length.
+    """
+
+    def __init__(self, engine, capacity):
+        self.engine = engine
+        self.capacity = capacity
+
+        self.state_size = engine.STATE_SIZE
+        self.slot_size = self.state_size + _BOARD_INDEX.size
+        self.states = bytearray(self.slot_size * capacity)
+        # A board is written at most once per tick, so a board slot is
+        # never overwritten while a tick that uses it is still kept
+        self.board_size = engine.board.max_packed_size
+        self.boards = bytearray(self.board_size * capacity)
+        self.clear()
+
+    def clear(self):
+        self.start = 0
+        self.count = 0
+        self.next_board = 0
+        # Seed and locked piece count of the newest board slot, -1 before
+        # any is written
+        self.board_seed = -1
+        self.board_pieces = -1
+        self.board_index = 0
+
+    def __len__(self):
+        return self.count
+
+    def record(self):
+        """Keep the engine's current state, dropping the oldest one when
+        the buffer is full"""
+        engine = self.engine
+        # Same game and same number of locked pieces means same board
+        if engine.pieces != self.board_pieces or engine.seed != self.board_seed:
+            self.board_seed, self.board_pieces = engine.seed, engine.pieces
+            self.board_index = self.next_board
+            self.next_board = (self.next_board + 1) % self.capacity
+            data = engine.board.to_bytes()
+            offset = self.board_index * self.board_size
+            self.boards[offset:offset + len(data)] = data
+
+        if self.count == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+        else:
+            self.count += 1
+        offset = (self.start + self.count - 1) % self.capacity * self.slot_size
+        engine.pack_state(self.states, offset)
+        _BOARD_INDEX.pack_into(self.states, offset + self.state_size,
+                               self.board_index)
+
+    def rewind(self, ticks):
+        """Restore the state recorded `ticks` records before the newest one,
+        or the oldest kept state. Newer records are dropped so the game
+        goes on from there. Returns the number of ticks rewound."""
+        if not self.count:
+            return 0
+        ticks = min(ticks, self.count - 1)
+        self.count -= ticks
+        offset = (self.start + self.count - 1) % self.capacity * self.slot_size
+
+        engine = self.engine
+        engine.unpack_state(self.states, offset)
+        board_index, = _BOARD_INDEX.unpack_from(self.states,
+                                                offset + self.state_size)
+        # Rewinding within the falling time of one piece keeps the board
+        if board_index != self.board_index:
+            board_offset = board_index * self.board_size
+            engine.board.load_bytes(
+                memoryview(self.boards)[board_offset:board_offset + self.board_size])
+
+        # Boards recorded after the restored one are free again
+        self.board_seed, self.board_pieces = engine.seed, engine.pieces
+        self.board_index = board_index
+        self.next_board = (board_index + 1) % self.capacity
+        return ticks
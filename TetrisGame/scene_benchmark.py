@@ -0,0 +1,117 @@
+import argparse
+import os
+import random
+import time
+import types
+
+# Render into memory when there is no display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+from TetrisGame.tetris_engine import NOOP, LEFT, RIGHT, ROTATE, SOFT_DROP
+from TetrisGame.tetris_game import TetrisScene
+
+ACTIONS = (NOOP, NOOP, NOOP, NOOP, LEFT, RIGHT, ROTATE, SOFT_DROP)
+
+
+def fill_board(engine, rng, fraction=0.5, density=0.7):
+    """Fill the bottom part of the board with cells, one gap per row so no
+    line is full"""
+    board = engine.board
+    for y in range(int(board.H * (1 - fraction)), board.H):
+        gap = rng.randrange(board.W)
+        for x in range(board.W):
+            if x != gap and rng.random() < density:
+                color = (rng.randrange(30, 256), rng.randrange(30, 256),
+                         rng.randrange(30, 256))
+                board.place(((0, 0),), x, y, color)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def benchmark(width, height, frames, screen, seed=0):
+    """Mean, p99 and max milliseconds of update() and render() with random
+    input on a half filled board"""
+    rng = random.Random(seed)
+    scene = TetrisScene(types.SimpleNamespace(), 'hard', seed=seed,
+                        width=width, height=height)
+    fill_board(scene.engine, rng)
+    updates, renders = [], []
+    for _ in range(frames):
+        scene.action = rng.choice(ACTIONS)
+        start = time.perf_counter()
+        scene.update()
+        middle = time.perf_counter()
+        scene.render(screen)
+        end = time.perf_counter()
+        updates.append((middle - start) * 1000)
+        renders.append((end - middle) * 1000)
+    return scene.TILE, sorted(updates), sorted(renders)
+
+
+def input_latency(seconds, screen, run_early=True, seed=0):
+    """Play `seconds` of random key presses through the same frame loop as
+    the scene manager and return the scene's latency report"""
+    rng = random.Random(seed)
+    scene = TetrisScene(types.SimpleNamespace(), 'easy', seed=seed)
+    keys = (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP)
+    clock = pygame.time.Clock()
+    update_step = 1000 / 60
+    accumulator = 0
+    for _ in range(int(seconds * 60)):
+        # About three presses a second
+        if rng.random() < 1 / 20:
+            key = rng.choice(keys)
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+            pygame.event.post(pygame.event.Event(pygame.KEYUP, key=key))
+        frame_time = clock.tick(60)
+        events = pygame.event.get()
+        scene.on_poll()
+        for event in events:
+            scene.handle_events(event)
+        accumulator = min(accumulator + frame_time, 250)
+        early = run_early and accumulator >= 0 and scene.input_pending()
+        while accumulator >= update_step or early:
+            early = False
+            scene.update()
+            accumulator -= update_step
+        pygame.display.update(scene.render(screen))
+        scene.on_present()
+    return scene.latency_report()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Frame cost of TetrisScene for different board sizes")
+    parser.add_argument('--sizes', nargs='+',
+                        default=['10x15', '20x40', '50x100', '100x200'],
+                        help="board sizes as WIDTHxHEIGHT")
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--latency', type=float, metavar='SECONDS',
+                        help="measure input to present latency instead")
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode((900, 700))
+    if args.latency:
+        for run_early in (False, True):
+            label = "early tick on input" if run_early else "fixed ticks only"
+            print(f"{label}: {input_latency(args.latency, screen, run_early)}")
+        pygame.quit()
+        return
+    print(f"{'board':>8} {'tile':>4}   update ms: mean   p99   max"
+          f"   render ms: mean   p99   max")
+    for size in args.sizes:
+        width, height = (int(n) for n in size.split('x'))
+        tile, updates, renders = benchmark(width, height, args.frames, screen)
+        print(f"{size:>8} {tile:>4}"
+              f"              {sum(updates) / len(updates):5.2f} "
+              f"{percentile(updates, 0.99):5.2f} {updates[-1]:5.2f}"
+              f"              {sum(renders) / len(renders):5.2f} "
+              f"{percentile(renders, 0.99):5.2f} {renders[-1]:5.2f}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
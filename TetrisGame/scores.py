@@ -0,0 +1,209 @@
+import argparse
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from TetrisGame.difficulty import DIFFICULTY_PROFILES
+
+APP_NAME = 'TetrisGame'
+DB_NAME = 'tetris_scores.db'
+
+
+def default_path():
+    """Database in the user's data directory, which unlike the working
+    directory is writable wherever the game is started from"""
+    if sys.platform == 'win32':
+        base = os.environ.get('APPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Application Support')
+    else:
+        base = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(base, APP_NAME, DB_NAME)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    difficulty TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    seed TEXT,
+    session TEXT NOT NULL,
+    played_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_score ON scores (difficulty, score DESC);
+CREATE INDEX IF NOT EXISTS scores_by_time ON scores (difficulty, played_at);
+CREATE INDEX IF NOT EXISTS scores_by_session ON scores (session, played_at);
+"""
+
+_COLUMNS = 'difficulty, score, lines, seed, session, played_at'
+
+
+class ScoreStore:
+    """Finished Tetris games in a SQLite database, shared by every front end.
+
+    The best scores of each difficulty are loaded once and kept in memory
+    with the games of this session, so record() and the leaderboard reads
+    a frame needs never touch the disk. New scores go to the cache right
+    away and are written by a background thread, in one transaction per
+    batch. When the database cannot be opened the scores of the session
+    are still kept in memory, they are just not saved.
+    """
+
+    # Scores per difficulty kept in memory for the leaderboard
+    CACHED_TOP = 10
+
+    def __init__(self, path=None):
+        self.path = path
+        self.session = time.strftime('%Y%m%d-%H%M%S-') + str(os.getpid())
+        # This session's games, oldest first
+        self.history = []
+        self.top = {difficulty: [] for difficulty in DIFFICULTY_PROFILES}
+
+        try:
+            if path is None:
+                self.path = default_path()
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = self._connect()
+            try:
+                db.executescript(_SCHEMA)
+                for difficulty in self.top:
+                    self.top[difficulty] = [dict(row) for row in db.execute(
+                        f"SELECT {_COLUMNS} FROM scores WHERE difficulty = ? "
+                        "ORDER BY score DESC LIMIT ?", (difficulty, self.CACHED_TOP))]
+            finally:
+                db.close()
+        except (sqlite3.Error, OSError) as e:
+            # Scores must never keep the game from starting
+            print(f"Error opening scores database {self.path}: {e}")
+            self.path = None
+
+        self.pending = queue.Queue()
+        self.thread = None
+        if self.path is not None:
+            self.thread = threading.Thread(target=self._write_scores, daemon=True)
+            self.thread.start()
+        self.closed = False
+
+    def _connect(self):
+        db = sqlite3.connect(self.path)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def best(self, difficulty):
+        top = self.top.get(difficulty)
+        return top[0]['score'] if top else 0
+
+    def record(self, difficulty, score, lines=0, seed=None):
+        """Add a finished game, returns whether it is a new best for the
+        difficulty"""
+        entry = {
+            'difficulty': difficulty,
+            'score': score,
+            'lines': lines,
+            # Same hex form as replay file names, 64-bit seeds do not fit
+            # SQLite's signed integers
+            'seed': None if seed is None else f"{seed:016x}",
+            'session': self.session,
+            'played_at': time.time(),
+        }
+        new_best = score > self.best(difficulty)
+        self.history.append(entry)
+        top = self.top.setdefault(difficulty, [])
+        top.append(entry)
+        top.sort(key=lambda e: e['score'], reverse=True)
+        del top[self.CACHED_TOP:]
+        if self.thread is not None and not self.closed:
+            self.pending.put(entry)
+        return new_best
+
+    def leaderboard(self, difficulty, count=CACHED_TOP):
+        """Best `count` games of the difficulty, from memory when they are
+        cached or there is no database"""
+        if count <= self.CACHED_TOP or self.path is None:
+            return self.top.get(difficulty, [])[:count]
+        return self.query(f"SELECT {_COLUMNS} FROM scores WHERE difficulty = ? "
+                          "ORDER BY score DESC LIMIT ?", (difficulty, count))
+
+    def session_history(self, session=None):
+        """Games of a session in play order, this session by default"""
+        if session is None or session == self.session:
+            return list(self.history)
+        return self.query(f"SELECT {_COLUMNS} FROM scores WHERE session = ? "
+                          "ORDER BY played_at", (session,))
+
+    def query(self, sql, parameters=()):
+        """Run a read on the database once the queued scores are written,
+        nothing without a database"""
+        if self.path is None:
+            return []
+        self.pending.join()
+        db = self._connect()
+        try:
+            return [dict(row) for row in db.execute(sql, parameters)]
+        finally:
+            db.close()
+
+    def close(self):
+        """Write the queued scores and stop the writer"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.thread is not None:
+            self.pending.put(None)
+            self.thread.join()
+
+    def _write_scores(self):
+        db = self._connect()
+        while True:
+            entries = [self.pending.get()]
+            # Everything queued meanwhile goes in the same transaction
+            while True:
+                try:
+                    entries.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in entries
+            rows = [tuple(entry[column] for column in _COLUMNS.split(', '))
+                    for entry in entries if entry is not None]
+            try:
+                with db:
+                    db.executemany(f"INSERT INTO scores ({_COLUMNS}) "
+                                   "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            except sqlite3.Error as e:
+                print(f"Error saving scores: {e}")
+            for _ in entries:
+                self.pending.task_done()
+            if stop:
+                db.close()
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the Tetris leaderboards")
+    parser.add_argument('--db', help="database file, in the user's data "
+                                     "directory by default")
+    parser.add_argument('--difficulty', choices=list(DIFFICULTY_PROFILES))
+    parser.add_argument('--top', type=int, default=ScoreStore.CACHED_TOP)
+    parser.add_argument('--session', help="list the games of one session")
+    args = parser.parse_args()
+
+    store = ScoreStore(args.db)
+    if args.session:
+        for entry in store.session_history(args.session):
+            print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['played_at']))}"
+                  f"  {entry['difficulty']:<7} {entry['score']:>7} {entry['lines']:>4} lines")
+    else:
+        difficulties = [args.difficulty] if args.difficulty else list(DIFFICULTY_PROFILES)
+        for difficulty in difficulties:
+            print(difficulty.upper())
+            for rank, entry in enumerate(store.leaderboard(difficulty, args.top), 1):
+                print(f"{rank:>3}. {entry['score']:>7} {entry['lines']:>4} lines  "
+                      f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['played_at']))}"
+                      f"  {entry['session']}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
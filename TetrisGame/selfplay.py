@@ -0,0 +1,137 @@
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.util import Finalize
+from TetrisGame.tetris_engine import (TetrisEngine, GameRandom,
+                                      NOOP, LEFT, RIGHT, ROTATE, SOFT_DROP)
+from TetrisGame.bot import TetrisBot
+from TetrisGame.difficulty import DIFFICULTY_PROFILES, profile_gravity
+from TetrisGame.dataset import DatasetWriter, PlacementRecorder
+
+# Inputs the random policy picks from, mostly doing nothing like a player
+RANDOM_ACTIONS = (NOOP, NOOP, NOOP, NOOP, LEFT, RIGHT, ROTATE, SOFT_DROP)
+
+FIELDS = ('difficulty', 'seed', 'score', 'lines', 'pieces', 'ticks', 'topped_out')
+
+# Dataset writer of a worker process, when placements are exported
+_writer = None
+
+
+def _start_worker(dataset_dir):
+    global _writer
+    if dataset_dir:
+        # Every worker writes its own shards
+        _writer = DatasetWriter(dataset_dir, prefix=f"selfplay-{os.getpid()}")
+        # Runs when the worker exits after pool.close(), atexit does not
+        Finalize(_writer, _writer.close, exitpriority=10)
+
+
+def simulate(gravity, seed, policy='bot', max_ticks=60 * 60 * 10,
+             reaction_ticks=0, input_interval=1, writer=None):
+    """Play one seeded game with TetrisEngine gravity arguments until it
+    tops out or lasts max_ticks, and return the engine. Placements go to
+    the DatasetWriter when one is given."""
+    engine = TetrisEngine(**gravity, seed=seed)
+    if policy == 'bot':
+        # A new bot per game keeps the worker's memory from growing with
+        # its transposition table
+        choose = TetrisBot(engine.W, engine.H, reaction_ticks=reaction_ticks,
+                           input_interval=input_interval).next_action
+    else:
+        rng = GameRandom(seed)
+
+        def choose(engine):
+            return RANDOM_ACTIONS[rng.randrange(len(RANDOM_ACTIONS))]
+
+    step = engine.step
+    if writer is None:
+        while not engine.game_over and engine.ticks < max_ticks:
+            step(choose(engine))
+    else:
+        observe = PlacementRecorder(engine, writer).observe
+        while not engine.game_over and engine.ticks < max_ticks:
+            step(choose(engine))
+            observe()
+    return engine
+
+
+def play_game(task):
+    """Play one game and return its result row. Runs in a worker process,
+    everything it needs is in the task."""
+    difficulty, seed, policy, max_ticks, reaction_ticks, input_interval = task
+    engine = simulate(profile_gravity(DIFFICULTY_PROFILES[difficulty]), seed,
+                      policy, max_ticks, reaction_ticks, input_interval, _writer)
+    return (difficulty, seed, engine.score, engine.lines, engine.pieces,
+            engine.ticks, int(engine.game_over))
+
+
+def tasks(difficulties, games, seed, *options):
+    for difficulty in difficulties:
+        for game in range(games):
+            yield (difficulty, seed + game, *options)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play many seeded Tetris games in parallel and write "
+                    "one result row per game")
+    parser.add_argument('--games', type=int, default=1000,
+                        help="games per difficulty")
+    parser.add_argument('--difficulty', nargs='+', choices=list(DIFFICULTY_PROFILES),
+                        default=list(DIFFICULTY_PROFILES))
+    parser.add_argument('--policy', choices=['bot', 'random'], default='bot')
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed of the first game, the others follow it")
+    parser.add_argument('--max-ticks', type=int, default=60 * 60 * 10,
+                        help="stop games that last longer (default 10 minutes)")
+    parser.add_argument('--reaction-ticks', type=int, default=0,
+                        help="ticks the bot waits after a piece spawns")
+    parser.add_argument('--input-interval', type=int, default=1,
+                        help="ticks between two bot inputs")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="games sent to a worker at once")
+    parser.add_argument('-o', '--output', default='selfplay.csv')
+    parser.add_argument('--dataset',
+                        help="also export every placement as training shards here")
+    args = parser.parse_args()
+
+    total = args.games * len(args.difficulty)
+    chunksize = args.chunksize
+    if chunksize is None:
+        # Big enough to keep the queue overhead low, small enough that all
+        # workers stay busy until the end
+        chunksize = max(1, min(32, total // (args.workers * 16)))
+
+    start = time.perf_counter()
+    done = 0
+    with open(args.output, 'w', newline='') as f, \
+            multiprocessing.Pool(args.workers, initializer=_start_worker,
+                                 initargs=(args.dataset,)) as pool:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        # Rows are written as games finish, in whatever order that is
+        results = pool.imap_unordered(
+            play_game,
+            tasks(args.difficulty, args.games, args.seed, args.policy,
+                  args.max_ticks, args.reaction_ticks, args.input_interval),
+            chunksize)
+        for row in results:
+            writer.writerow(row)
+            done += 1
+            if done % 100 == 0 or done == total:
+                f.flush()
+                elapsed = time.perf_counter() - start
+                print(f"\r{done}/{total} games, {done / elapsed:.1f} games/s",
+                      end='', file=sys.stderr)
+        # Let the workers exit on their own so they write their last shards
+        pool.close()
+        pool.join()
+    print(file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
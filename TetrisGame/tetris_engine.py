@@ -0,0 +1,279 @@
+import random
+import struct
+from TetrisGame.board import Board
+from TetrisGame.pieces import ROTATIONS, NUM_SHAPES, NUM_ROTATIONS, spawn_position
+
+# Input bits for TetrisEngine.step, combine them with |
+NOOP = 0
+LEFT = 1
+RIGHT = 2
+ROTATE = 4
+SOFT_DROP = 8
+# Falls at soft drop speed during this tick only, for a held key
+FAST_FALL = 16
+
+# Points for the number of lines cleared by one piece
+SCORES = {0: 0, 1: 100, 2: 300, 3: 700, 4: 1500}
+
+# Fixed simulation rate, one step() is 1 / TICK_RATE seconds
+TICK_RATE = 60
+
+# Color of garbage rows sent by opponents in versus games
+GARBAGE_COLOR = (110, 110, 110)
+
+
+class GameRandom:
+    """Small splitmix64 generator. Its whole state is one 64-bit int, so
+    it fits in engine snapshots and replays."""
+
+    MASK = (1 << 64) - 1
+
+    def __init__(self, seed=0):
+        self.state = seed & self.MASK
+
+    def next64(self):
+        self.state = z = (self.state + 0x9E3779B97F4A7C15) & self.MASK
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & self.MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & self.MASK
+        return z ^ (z >> 31)
+
+    def randrange(self, start, stop=None):
+        if stop is None:
+            start, stop = 0, start
+        return start + ((self.next64() * (stop - start)) >> 64)
+
+
+def gravity_from_anim(anim_speed, anim_limit, speed_increase,
+                      lock_anim_limit=None, soft_drop_limit=100, fps=TICK_RATE):
+    """Convert the old frame-counted gravity settings to TetrisEngine
+    gravity arguments in rows per second.
+
+    The old loop added anim_speed to a counter every frame and dropped the
+    piece one row once it passed anim_limit. anim_limit went back to
+    lock_anim_limit after every lock and down to soft_drop_limit on a soft
+    drop, and anim_speed grew by speed_increase per cleared line.
+
+    The old soft drop speed did not depend on the limit, while the engine
+    soft drops at a multiple of the current gravity. The factor is taken
+    from lock_anim_limit, so it is exact from the first lock on. When
+    anim_limit differs from lock_anim_limit, the first piece soft drops
+    lock_anim_limit / anim_limit times as fast as it used to.
+    """
+    if lock_anim_limit is None:
+        lock_anim_limit = anim_limit
+    return {
+        'gravity': fps * anim_speed / anim_limit,
+        'gravity_increase': fps * speed_increase / lock_anim_limit,
+        'lock_gravity': fps * anim_speed / lock_anim_limit,
+        'soft_drop_factor': lock_anim_limit / soft_drop_limit,
+    }
+
+
+class TetrisEngine:
+    """Headless Tetris rules, advanced one tick at a time with step(action).
+
+    Nothing in here knows about pygame or the display, front ends read the
+    board and piece state after each step and draw it themselves. Every game
+    is driven by its own seed, so the same seed and inputs replay the same
+    game.
+    """
+
+    # Everything but the board in a snapshot()
+    _STATE = struct.Struct('<QQQIIIIIBBhhB3B3Bdd??')
+    STATE_SIZE = _STATE.size
+
+    def __init__(self, gravity, gravity_increase, lock_gravity=None,
+                 soft_drop_factor=10, width=10, height=15, seed=None,
+                 tick_rate=TICK_RATE):
+        self.W, self.H = width, height
+        self.tick_rate = tick_rate
+        self.configure(gravity, gravity_increase, lock_gravity, soft_drop_factor)
+
+        self.rng = GameRandom()
+        self.board = Board(width, height)
+        self.reset(random.getrandbits(64) if seed is None else seed)
+
+    def configure(self, gravity, gravity_increase, lock_gravity=None,
+                  soft_drop_factor=10):
+        """Set the falling speed, all speeds are in rows per second"""
+        self.start_gravity = gravity
+        # Added to the gravity for every cleared line
+        self.gravity_increase = gravity_increase
+        # Gravity restored (plus the line increases) when a piece locks
+        self.lock_gravity = gravity if lock_gravity is None else lock_gravity
+        # A soft drop makes the piece fall this many times faster
+        self.soft_drop_factor = soft_drop_factor
+        self.gravity = gravity
+
+    def reset(self, seed=None):
+        """Start a new game on an empty board. Without a seed the new game
+        seed is drawn from the previous game."""
+        if seed is None:
+            seed = self.rng.next64()
+        self.seed = seed
+        self.rng.state = seed
+        # Garbage holes have their own generator so boards sharing a seed
+        # keep getting the same pieces whatever garbage they receive
+        self.garbage_rng = GameRandom(seed ^ 0x6A09E667F3BCC908)
+        self.pending_garbage = 0
+        self.ticks = 0
+
+        self.board.reset()
+        self.gravity = self.start_gravity
+        self.soft_drop = False
+        # Fraction of a row the piece has fallen since its last row drop
+        self.fall_progress = 0.0
+
+        self.score, self.lines, self.pieces = 0, 0, 0
+        self.game_over = False
+        # (shape, rotation, x, y) the last piece locked at
+        self.last_placement = None
+
+        self.next_shape = self.rng.randrange(NUM_SHAPES)
+        self.next_color = self.random_color()
+        self.spawn_piece()
+
+    def random_color(self):
+        randrange = self.rng.randrange
+        return (randrange(30, 256), randrange(30, 256), randrange(30, 256))
+
+    def spawn_piece(self):
+        """Make the next figure the falling piece and pick a new next one"""
+        self.shape, self.color = self.next_shape, self.next_color
+        self.next_shape = self.rng.randrange(NUM_SHAPES)
+        self.next_color = self.random_color()
+        self.rotation = 0
+        self.piece_x, self.piece_y = spawn_position(self.shape, self.W)
+
+    def fits(self, rotation, x, y):
+        """Check whether the falling piece fits at the given state"""
+        return not self.board.collides(ROTATIONS[self.shape][rotation], x, y)
+
+    def ghost_y(self):
+        """Row the falling piece would land on if dropped straight down"""
+        return self.piece_y + self.board.drop_distance(
+            ROTATIONS[self.shape][self.rotation], self.piece_x, self.piece_y)
+
+    def piece_cells(self):
+        """Yield the board cells of the falling piece"""
+        x, y = self.piece_x, self.piece_y
+        for dx, dy in ROTATIONS[self.shape][self.rotation]:
+            yield x + dx, y + dy
+
+    def next_piece_cells(self):
+        """Yield the cells the next figure will spawn on"""
+        x, y = spawn_position(self.next_shape, self.W)
+        for dx, dy in ROTATIONS[self.next_shape][0]:
+            yield x + dx, y + dy
+
+    def lock_piece(self):
+        """Lock the falling piece, clear lines and spawn the next one.
+        Returns the number of cleared lines."""
+        board = self.board
+        offsets = ROTATIONS[self.shape][self.rotation]
+        board.place(offsets, self.piece_x, self.piece_y, self.color)
+        self.last_placement = (self.shape, self.rotation, self.piece_x, self.piece_y)
+        self.pieces += 1
+        self.soft_drop = False
+        self.fall_progress = 0.0
+
+        # Only the rows the piece landed on can have become full
+        lines = board.clear_lines(self.piece_y + dy for dx, dy in offsets)
+        if lines:
+            self.lines += lines
+            self.score += SCORES[lines]
+        # Every cleared line makes the game faster
+        self.gravity = self.lock_gravity + self.gravity_increase * self.lines
+
+        overflow = False
+        if self.pending_garbage:
+            overflow = board.add_garbage(self.pending_garbage,
+                                         self.garbage_rng.randrange(self.W),
+                                         GARBAGE_COLOR)
+            self.pending_garbage = 0
+
+        if overflow or board.is_topped_out():
+            self.game_over = True
+        else:
+            self.spawn_piece()
+        return lines
+
+    def add_garbage(self, lines):
+        """Queue garbage lines from an opponent, they rise from the bottom
+        when the falling piece locks"""
+        self.pending_garbage += lines
+
+    def step(self, action=NOOP):
+        """Advance the game by one tick.
+        Returns the number of lines cleared during the tick."""
+        if self.game_over:
+            return 0
+        self.ticks += 1
+
+        collides = self.board.collides
+        offsets = ROTATIONS[self.shape]
+        x, y, rotation = self.piece_x, self.piece_y, self.rotation
+
+        # Moves are tried against the board and only committed if legal
+        # Move x
+        dx = ((action & RIGHT) >> 1) - (action & LEFT)
+        if dx and not collides(offsets[rotation], x + dx, y):
+            x += dx
+            self.piece_x = x
+
+        # Rotate
+        if action & ROTATE:
+            next_rotation = (rotation + 1) % NUM_ROTATIONS
+            if not collides(offsets[next_rotation], x, y):
+                rotation = self.rotation = next_rotation
+
+        # A soft drop lasts until the piece locks
+        if action & SOFT_DROP:
+            self.soft_drop = True
+
+        # Move y, fast gravity can drop several rows in one tick
+        if self.soft_drop or action & FAST_FALL:
+            rate = self.gravity * self.soft_drop_factor
+        else:
+            rate = self.gravity
+        self.fall_progress += rate / self.tick_rate
+        while self.fall_progress >= 1:
+            self.fall_progress -= 1
+            if collides(offsets[rotation], x, y + 1):
+                return self.lock_piece()
+            y += 1
+            self.piece_y = y
+        return 0
+
+    def pack_state(self, buffer, offset=0):
+        """Pack everything but the board into buffer at offset, without
+        allocating. Takes STATE_SIZE bytes."""
+        self._STATE.pack_into(
+            buffer, offset, self.seed, self.rng.state, self.garbage_rng.state,
+            self.ticks, self.score, self.lines, self.pieces, self.pending_garbage,
+            self.shape, self.rotation, self.piece_x, self.piece_y, self.next_shape,
+            self.color[0], self.color[1], self.color[2], self.next_color[0],
+            self.next_color[1], self.next_color[2], self.gravity,
+            self.fall_progress, self.soft_drop, self.game_over)
+
+    def unpack_state(self, buffer, offset=0):
+        """Load a state packed by pack_state(), the board is left as is"""
+        state = self._STATE.unpack_from(buffer, offset)
+        (self.seed, self.rng.state, self.garbage_rng.state, self.ticks,
+         self.score, self.lines, self.pieces, self.pending_garbage, self.shape,
+         self.rotation, self.piece_x, self.piece_y, self.next_shape) = state[:13]
+        self.color, self.next_color = state[13:16], state[16:19]
+        (self.gravity, self.fall_progress, self.soft_drop,
+         self.game_over) = state[19:]
+
+    def snapshot(self):
+        """Pack the whole game state (board, piece, RNGs, score, gravity,
+        queued garbage) into bytes for keyframes and rewinding"""
+        data = bytearray(self.STATE_SIZE)
+        self.pack_state(data)
+        return bytes(data) + self.board.to_bytes()
+
+    def restore(self, data):
+        """Load a state packed by snapshot()"""
+        self.unpack_state(data)
+        self.board.load_bytes(memoryview(data)[self.STATE_SIZE:])
@@ -1,13 +1,38 @@
 import pygame
+import collections
 import os
-from copy import deepcopy
-from random import choice, randrange
+import time
+from random import randrange
+from TetrisGame.pieces import ROTATIONS, spawn_position
+from TetrisGame.tetris_engine import TetrisEngine, NOOP, LEFT, RIGHT, ROTATE, FAST_FALL
+from TetrisGame.replay import ReplayRecorder
+from TetrisGame.difficulty import DIFFICULTY_PROFILES, difficulty_name, profile_gravity
+from TetrisGame.bot import TetrisBot
+from TetrisGame.hints import PlacementHints
+from TetrisGame.rewind import RewindBuffer
 
 
 class TetrisScene:
-    def __init__(self, game_state, difficulty='easy'):
+    # Piece sprites kept before the cache starts over, every piece has a
+    # random color
+    MAX_SPRITES = 256
+    # Updated and drawn every frame by the scene manager, other scenes are
+    # only drawn when an event comes
+    CONTINUOUS = True
+
+    def __init__(self, game_state, difficulty='easy', seed=None, replay_dir=None,
+                 autoplay=False, hints=False, rewind_seconds=10, dataset_dir=None,
+                 width=10, height=15, tile=45, scores=None):
         self.game_state = game_state
+        # Finished games go to this ScoreStore when set
+        self.scores = scores
         self.difficulty = difficulty.lower()
+        # Finished games are saved here as replays when set
+        self.replay_dir = replay_dir
+        # The bot plays instead of the keyboard, B toggles it in game
+        self.autoplay = autoplay
+        # Show where the bot would put the piece, H toggles it in game
+        self.hints = hints
 
         # Set up paths
         self.base_dir = os.path.dirname(
@@ -15,14 +40,24 @@ class TetrisScene:
         self.tetris_folder_path = os.path.join(self.base_dir, "TetrisGame")
 
         # Tetris constants
-        self.W, self.H = 10, 15
-        self.TILE = 45
-        self.GAME_RES = self.W * self.TILE, self.H * self.TILE
+        self.W, self.H = width, height
         self.RES = 900, 700
+        self.SIDEBAR_W = 390
+        # Tiles shrink below `tile` until the board and the sidebar fit the
+        # window
+        self.TILE = max(1, min(tile,
+                               (self.RES[0] - 60 - self.SIDEBAR_W) // self.W,
+                               (self.RES[1] - 20) // self.H))
+        self.GAME_RES = self.W * self.TILE, self.H * self.TILE
+        # The next figure is drawn at a fixed size whatever the board size
+        self.PREVIEW_TILE = 45
         self.FPS = 60
-
-        # Create game surface
-        self.game_sc = pygame.Surface(self.GAME_RES)
+        # Animations are timed in milliseconds and advance across frames
+        self.LINE_PAUSE_MS = 200  # Pause per cleared line
+        self.GAME_OVER_MS = 600  # Time to fill the whole grid at game over
+        # A held left or right key repeats after DAS_MS, then every ARR_MS
+        self.DAS_MS = 170
+        self.ARR_MS = 50
 
         # Calculate positions based on resolution
         self.game_sc_x = 20
@@ -30,42 +65,46 @@ class TetrisScene:
         self.game_sc_y = (self.RES[1] - self.GAME_RES[1]) // 2
         self.sidebar_x = self.game_sc_x + \
             self.GAME_RES[0] + 40  # Right side position
+        self.board_rect = pygame.Rect((self.game_sc_x, self.game_sc_y),
+                                      self.GAME_RES)
 
         # Create grid
         self.grid = [pygame.Rect(x * self.TILE, y * self.TILE, self.TILE, self.TILE)
                      for x in range(self.W) for y in range(self.H)]
 
-        # Define figures positions
-        self.figures_pos = [[(-1, 0), (-2, 0), (0, 0), (1, 0)],
-                            [(0, -1), (-1, -1), (-1, 0), (0, 0)],
-                            [(-1, 0), (-1, 1), (0, 0), (0, -1)],
-                            [(0, 0), (-1, 0), (0, 1), (-1, -1)],
-                            [(0, 0), (0, -1), (0, 1), (-1, -1)],
-                            [(0, 0), (0, -1), (0, 1), (1, -1)],
-                            [(0, 0), (0, -1), (0, 1), (-1, 0)]]
-
-        self.figures = [[pygame.Rect(x + self.W // 2, y + 1, 1, 1)
-                         for x, y in fig_pos] for fig_pos in self.figures_pos]
-
-        self.figure_rect = pygame.Rect(0, 0, self.TILE - 2, self.TILE - 2)
-        self.field = [[0 for i in range(self.W)] for j in range(self.H)]
+        # Leave a gap between cells, a thinner one on tiny tiles
+        cell = self.TILE - 2 if self.TILE > 4 else max(1, self.TILE - 1)
+        self.figure_rect = pygame.Rect(0, 0, cell, cell)
+        self.preview_cell = self.PREVIEW_TILE - 2
 
         # Set difficulty parameters
-        if self.difficulty == 'easy':
-            self.anim_speed = 60
-            self.anim_limit = 2000
-            self.speed_increase = 2  # Smaller speed increase when clearing lines
-        elif self.difficulty == 'medium':
-            self.anim_speed = 80
-            self.anim_limit = 1500
-            self.speed_increase = 3
-        else:  # difficult -> now hard
-            self.difficulty = 'hard'  # Change 'difficult' to 'hard'
-            self.anim_speed = 150     # Increased from 100 to 150
-            self.anim_limit = 700     # Decreased from 1000 to 700
-            self.speed_increase = 6   # Increased from 4 to 6
-
-        self.anim_count = 0
+        self.set_difficulty(difficulty)
+
+        # Game rules run in the headless engine, this scene only feeds it
+        # input and draws its state
+        self.engine = TetrisEngine(**self.gravity_settings(),
+                                   width=self.W, height=self.H, seed=seed)
+        # Every game is recorded so it can be reproduced from its seed
+        self.recorder = ReplayRecorder(self.engine)
+        self.bot = TetrisBot(self.W, self.H)
+        self.hint = PlacementHints(self.W, self.H)
+        # The worker spawns in the background while the game starts
+        if self.hints:
+            self.hint.start()
+        # R steps the game back one second, up to rewind_seconds
+        self.rewind = RewindBuffer(
+            self.engine, rewind_seconds * self.engine.tick_rate + 1)
+        self.rewind.record()
+        # Every placement is exported as a training sample when set
+        self.placements = None
+        self.dataset_writer = None
+        if dataset_dir:
+            # Needs numpy, which the game itself does not
+            from TetrisGame.dataset import DatasetWriter, PlacementRecorder
+            self.dataset_writer = DatasetWriter(
+                dataset_dir, self.W, self.H,
+                prefix=time.strftime('play-%Y%m%d-%H%M%S'))
+            self.placements = PlacementRecorder(self.engine, self.dataset_writer)
 
         # Load assets
         try:
@@ -80,6 +119,41 @@ class TetrisScene:
             self.game_bg = pygame.Surface(self.GAME_RES)
             self.game_bg.fill((0, 0, 0))
 
+        # The background and grid never change, draw them once
+        self.board_bg = pygame.Surface(self.GAME_RES).convert()
+        self.board_bg.blit(self.game_bg, (0, 0))
+        if self.TILE > 4:
+            for i_rect in self.grid:
+                pygame.draw.rect(self.board_bg, (40, 40, 40), i_rect, 1)
+
+        # The background where the gaps between cells are, drawn over the
+        # cells scaled up from the board
+        self.cell_gaps = None
+        if self.figure_rect.w < self.TILE:
+            self.cell_gaps = pygame.Surface(self.GAME_RES, pygame.SRCALPHA)
+            self.cell_gaps.blit(self.board_bg, (0, 0))
+            for i_rect in self.grid:
+                self.figure_rect.topleft = i_rect.topleft
+                self.cell_gaps.fill((0, 0, 0, 0), self.figure_rect)
+
+        # Grid plus locked cells, only redrawn when the board changes
+        self.stack_sc = pygame.Surface(self.GAME_RES).convert()
+        self.stack_key = None
+        # Pieces drawn once per shape, rotation and color
+        self.sprites = {}
+        # What the screen shows: everything is drawn again on a full
+        # redraw, otherwise only what changed since the last frame
+        self.full_redraw = True
+        self.screen_bg = None
+        self.stack_drawn = None
+        self.piece_key = self.piece_rect = None
+        self.preview_key = self.preview_rect = None
+        # Sidebar values as (value, rect) per slot
+        self.values = {}
+        # Cells filled so far by the game over animation
+        self.game_over_sc = pygame.Surface(self.GAME_RES, pygame.SRCALPHA)
+        self.game_over_filled = 0
+
         # Load fonts - BEFORE creating text
         try:
             self.main_font = pygame.font.Font(os.path.join(
@@ -96,73 +170,69 @@ class TetrisScene:
             'TETRIS', True, pygame.Color('darkorange'))
 
         # Create difficulty text with appropriate color
-        difficulty_text = f"{self.difficulty.upper()} MODE"
-        difficulty_color = pygame.Color('green')
-        if self.difficulty == 'medium':
-            difficulty_color = pygame.Color('yellow')
-        elif self.difficulty == 'hard':  # Changed from 'difficult' to 'hard'
-            difficulty_color = pygame.Color('red')
         self.title_difficulty = self.font.render(
-            difficulty_text, True, difficulty_color)
+            f"{self.difficulty.upper()} MODE", True,
+            pygame.Color(self.profile['color']))
 
         self.title_score = self.font.render(
             'SCORE:', True, pygame.Color('green'))
-
-        # Initialize game variables
-        self.figure, self.next_figure = deepcopy(
-            choice(self.figures)), deepcopy(choice(self.figures))
-        self.color, self.next_color = self.get_color(), self.get_color()
-
-        self.score, self.lines = 0, 0
-        self.scores = {0: 0, 1: 100, 2: 300, 3: 700, 4: 1500}
+        self.title_record = self.font.render(
+            'BEST:', True, pygame.Color('purple'))
 
         # Game state
-        self.dx, self.rotate = 0, False
+        self.action = NOOP
+        # Held left/right keys in press order: their action and the time of
+        # their next repeat
+        self.held = {}
+        self.drop_held = False
+        # perf_counter() times of the inputs waiting for a tick, then of
+        # those waiting for the frame that shows them
+        self.input_times = []
+        self.applied_times = []
+        # End of the previous and of the latest event poll. An input read
+        # in a poll was pressed after the previous one ended at the latest.
+        self.input_since = self.last_poll = time.perf_counter()
+        # Milliseconds from the input to presenting its frame
+        self.latencies = collections.deque(maxlen=10000)
         self.game_over = False
-        self.pause_lines = 0
+        self.game_over_start = 0
+        self.pause_until = 0
+        self.rewind_requested = False
 
     def set_difficulty(self, difficulty):
         """Set game parameters based on difficulty level"""
-        self.difficulty = difficulty.lower()
+        self.difficulty = difficulty_name(difficulty)
+        self.profile = DIFFICULTY_PROFILES[self.difficulty]
 
-        # Set initial game speed based on difficulty
-        if self.difficulty == 'easy':
-            self.anim_speed = 60
-            self.anim_limit = 2000
-            self.speed_increase = 2  # Smaller speed increase when clearing lines
-        elif self.difficulty == 'medium':
-            self.anim_speed = 80
-            self.anim_limit = 1500
-            self.speed_increase = 3
-        else:  # Change difficult to hard
-            self.difficulty = 'hard'  # Standardize 'difficult' to 'hard'
-            self.anim_speed = 150     # Increased from 100 to 150
-            self.anim_limit = 700     # Decreased from 1000 to 700
-            self.speed_increase = 6   # Increased from 4 to 6
-
-        # Update the difficulty text
-        difficulty_text = f"{self.difficulty.upper()} MODE"
-        difficulty_color = pygame.Color('green')
-        if self.difficulty == 'medium':
-            difficulty_color = pygame.Color('yellow')
-        elif self.difficulty == 'hard':  # Changed from 'difficult' to 'hard'
-            difficulty_color = pygame.Color('red')
+        # Apply the new speeds to the running game
+        if hasattr(self, 'engine'):
+            self.engine.configure(**self.gravity_settings())
 
         # Make sure font is initialized before rendering
         if hasattr(self, 'font'):
             self.title_difficulty = self.font.render(
-                difficulty_text, True, difficulty_color)
+                f"{self.difficulty.upper()} MODE", True,
+                pygame.Color(self.profile['color']))
+            # The sidebar shows the new title from the next frame on
+            self.screen_bg = None
+            self.full_redraw = True
+
+    def gravity_settings(self):
+        """Engine gravity in rows per second for the difficulty settings"""
+        return profile_gravity(self.profile, fps=self.FPS)
 
     def get_color(self):
         return (randrange(30, 256), randrange(30, 256), randrange(30, 256))
 
-    def check_borders(self):
-        for i in range(4):
-            if self.figure[i].x < 0 or self.figure[i].x > self.W - 1:
-                return False
-            elif self.figure[i].y > self.H - 1 or self.field[self.figure[i].y][self.figure[i].x]:
-                return False
-        return True
+    def save_replay(self):
+        """Write the current game to replay_dir, named after its seed"""
+        os.makedirs(self.replay_dir, exist_ok=True)
+        path = os.path.join(self.replay_dir,
+                            f"tetris_{self.difficulty}_{self.engine.seed:016x}.replay")
+        try:
+            self.recorder.save(path)
+        except OSError as e:
+            print(f"Error saving replay: {e}")
 
     def handle_events(self, event):
         """Handle Pygame events"""
@@ -170,181 +240,307 @@ class TetrisScene:
             return
 
         if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_LEFT:
-                self.dx = -1
-            elif event.key == pygame.K_RIGHT:
-                self.dx = 1
+            pressed = self.input_since
+            if event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                action = LEFT if event.key == pygame.K_LEFT else RIGHT
+                self.action |= action
+                # Only the last pressed direction repeats
+                self.held.pop(event.key, None)
+                self.held[event.key] = (action, time.perf_counter() + self.DAS_MS / 1000)
+                self.input_times.append(pressed)
             elif event.key == pygame.K_DOWN:
-                self.anim_limit = 100
+                # The piece falls fast for as long as the key is down
+                self.drop_held = True
+                self.input_times.append(pressed)
             elif event.key == pygame.K_UP:
-                self.rotate = True
+                self.action |= ROTATE
+                self.input_times.append(pressed)
+            elif event.key == pygame.K_b:
+                self.autoplay = not self.autoplay
+            elif event.key == pygame.K_h:
+                self.hints = not self.hints
+            elif event.key == pygame.K_r:
+                self.rewind_requested = True
+        elif event.type == pygame.KEYUP:
+            if event.key in self.held:
+                released_last = event.key == next(reversed(self.held))
+                del self.held[event.key]
+                # The other direction, if still down, repeats again after
+                # a new delay
+                if released_last and self.held:
+                    key = next(reversed(self.held))
+                    self.held[key] = (self.held[key][0],
+                                      time.perf_counter() + self.DAS_MS / 1000)
+            if event.key == pygame.K_DOWN:
+                self.drop_held = False
+
+    def on_poll(self):
+        """Called by the scene manager right after it reads events, before
+        handling them"""
+        self.input_since, self.last_poll = self.last_poll, time.perf_counter()
+
+    def input_pending(self):
+        """Whether inputs are waiting for the next tick"""
+        return bool(self.input_times)
+
+    def on_present(self):
+        """Called right after a frame is on the display"""
+        if self.applied_times:
+            now = time.perf_counter()
+            self.latencies.extend((now - t) * 1000 for t in self.applied_times)
+            self.applied_times.clear()
+
+    def latency_report(self):
+        """Percentiles of the input to present latency, None without input"""
+        if not self.latencies:
+            return None
+        values = sorted(self.latencies)
+
+        def percentile(fraction):
+            return values[min(len(values) - 1, int(fraction * len(values)))]
+        return (f"Input to present latency over {len(values)} inputs: "
+                f"p50 {percentile(0.5):.1f} ms, p95 {percentile(0.95):.1f} ms, "
+                f"p99 {percentile(0.99):.1f} ms, max {values[-1]:.1f} ms")
+
+    def close(self):
+        """Stop the hint worker and write the last dataset shard"""
+        self.hint.close()
+        if self.dataset_writer:
+            self.dataset_writer.close()
 
     def update(self):
         """Update game state"""
-        # Process line deletion pause
-        if self.pause_lines > 0:
-            pygame.time.delay(200)
-            self.pause_lines -= 1
+        now = pygame.time.get_ticks()
+
+        # The game over animation plays in render(), the game stays frozen
+        if self.game_over:
+            self.input_times.clear()
             return
 
-        # Move x
-        figure_old = deepcopy(self.figure)
-        for i in range(4):
-            self.figure[i].x += self.dx
-            if not self.check_borders():
-                self.figure = deepcopy(figure_old)
-                break
-
-        # Rotate - BEFORE resetting flags
-        center = self.figure[0]
-        figure_old = deepcopy(self.figure)
-        if self.rotate:
-            for i in range(4):
-                x = self.figure[i].y - center.y
-                y = self.figure[i].x - center.x
-                self.figure[i].x = center.x - x
-                self.figure[i].y = center.y + y
-                if not self.check_borders():
-                    self.figure = deepcopy(figure_old)
-                    break
-
-        # Move y
-        self.anim_count += self.anim_speed
-        if self.anim_count > self.anim_limit:
-            self.anim_count = 0
-            figure_old = deepcopy(self.figure)
-            for i in range(4):
-                self.figure[i].y += 1
-                if not self.check_borders():
-                    for i in range(4):
-                        self.field[figure_old[i].y][figure_old[i].x] = self.color
-                    self.figure, self.color = self.next_figure, self.next_color
-                    self.next_figure, self.next_color = deepcopy(
-                        choice(self.figures)), self.get_color()
-
-                    # Reset falling speed based on current difficulty
-                    if self.difficulty == 'easy':
-                        self.anim_limit = 2000
-                    elif self.difficulty == 'medium':
-                        self.anim_limit = 1500
-                    else:  # difficult
-                        self.anim_limit = 1000
-                    break
-
-        # Check lines
-        line, lines = self.H - 1, 0
-        for row in range(self.H - 1, -1, -1):
-            count = 0
-            for i in range(self.W):
-                if self.field[row][i]:
-                    count += 1
-                self.field[line][i] = self.field[row][i]
-            if count < self.W:
-                line -= 1
-            else:
-                # Speed increase depends on difficulty
-                self.anim_speed += self.speed_increase
-                lines += 1
+        # Never blocks, the hint shows up once the worker has it
+        if self.hints:
+            self.hint.update(self.engine)
+
+        if self.rewind_requested:
+            self.rewind_requested = False
+            if self.rewind.rewind(self.engine.tick_rate):
+                # The replay goes on from the rewound tick
+                self.recorder.truncate(self.engine.ticks)
+                self.pause_until = 0
+
+        # Line deletion pause, input keeps being collected meanwhile. The
+        # wait would count as latency, so those inputs are not timed.
+        if now < self.pause_until:
+            self.input_times.clear()
+            return
 
-        # Set pause for line animation
-        self.pause_lines = lines
+        # Auto-repeat of the last held direction, at most one move per tick
+        if self.held:
+            now_s = time.perf_counter()
+            key = next(reversed(self.held))
+            action, next_repeat = self.held[key]
+            if now_s >= next_repeat:
+                self.action |= action
+                self.held[key] = (action, max(next_repeat + self.ARR_MS / 1000, now_s))
+        if self.drop_held:
+            self.action |= FAST_FALL
+
+        if self.autoplay:
+            self.action = self.bot.next_action(self.engine)
+
+        self.recorder.record(self.action)
+        lines = self.engine.step(self.action)
+        # The inputs are applied, they count once their frame is presented
+        self.applied_times += self.input_times
+        self.input_times.clear()
+        self.rewind.record()
+        if self.placements:
+            self.placements.observe()
 
-        # Compute score
-        self.score += self.scores[lines]
+        # Set pause for line animation
+        if lines:
+            self.pause_until = now + self.LINE_PAUSE_MS * lines
 
         # Check game over
-        for i in range(self.W):
-            if self.field[0][i]:
-                self.field = [[0 for i in range(self.W)]
-                              for i in range(self.H)]
-
-                # Reset animation speed based on difficulty
-                if self.difficulty == 'easy':
-                    self.anim_speed = 60
-                    self.anim_limit = 2000
-                elif self.difficulty == 'medium':
-                    self.anim_speed = 80
-                    self.anim_limit = 1500
-                else:  # hard mode (was difficult)
-                    self.anim_speed = 150     # Increased from 100 to 150
-                    self.anim_limit = 700     # Decreased from 1000 to 700
-
-                self.anim_count = 0
-                self.score = 0
-                self.game_over = True
-                break
+        if self.engine.game_over:
+            if self.scores:
+                self.scores.record(self.difficulty, self.engine.score,
+                                   self.engine.lines, self.engine.seed)
+            if self.replay_dir:
+                self.save_replay()
+            self.engine.reset()
+            self.recorder.start()
+            self.rewind.clear()
+            self.rewind.record()
+            self.game_over = True
+            self.game_over_start = now
+            self.game_over_sc.fill((0, 0, 0, 0))
+            self.game_over_filled = 0
 
         # Reset single-frame actions AFTER using them
-        self.dx, self.rotate = 0, False
+        self.action = NOOP
+
+    def invalidate(self):
+        """Draw everything on the next render, after something else drew
+        on the screen"""
+        self.full_redraw = True
+        # Polls made while another scene was on screen do not count
+        self.input_since = self.last_poll = time.perf_counter()
+
+    def piece_sprite(self, shape, rotation, color, tile, cell):
+        """Piece drawn once on a transparent surface, with the offset of its
+        top left cell"""
+        key = (shape, rotation, color, tile)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            if len(self.sprites) >= self.MAX_SPRITES:
+                self.sprites.clear()
+            offsets = ROTATIONS[shape][rotation]
+            min_dx = min(dx for dx, dy in offsets)
+            min_dy = min(dy for dx, dy in offsets)
+            width = (max(dx for dx, dy in offsets) - min_dx) * tile + cell
+            height = (max(dy for dx, dy in offsets) - min_dy) * tile + cell
+            surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            for dx, dy in offsets:
+                surface.fill(color, ((dx - min_dx) * tile, (dy - min_dy) * tile,
+                                     cell, cell))
+            sprite = self.sprites[key] = surface, min_dx, min_dy
+        return sprite
+
+    def draw_value(self, screen, slot, value, color, pos, dirty):
+        """Draw a sidebar value if it changed since the last frame"""
+        old = self.values.get(slot)
+        if old is not None:
+            if old[0] == value:
+                return
+            screen.blit(self.screen_bg, old[1], old[1])
+            dirty.append(old[1])
+        text = self.font.render(str(value), True, pygame.Color(color))
+        rect = screen.blit(text, pos)
+        dirty.append(rect)
+        self.values[slot] = value, rect
+
+    def build_screen_bg(self):
+        """Background and every fixed text of the sidebar in one surface"""
+        self.screen_bg = self.bg.copy()
+        self.screen_bg.blit(self.title_tetris, (self.sidebar_x, self.game_sc_y + 20))
+        self.screen_bg.blit(self.title_difficulty,
+                            (self.sidebar_x, self.game_sc_y + 120))
+        self.screen_bg.blit(self.title_score, (self.sidebar_x, self.game_sc_y + 200))
+        if self.scores:
+            self.screen_bg.blit(self.title_record,
+                                (self.sidebar_x + 210, self.game_sc_y + 200))
+        next_text = self.font.render("NEXT FIGURE", True, pygame.Color('white'))
+        self.screen_bg.blit(next_text, (self.sidebar_x, self.game_sc_y + 370))
 
     def render(self, screen):
-        """Render Tetris game on the main screen"""
-        # Draw background
-        screen.blit(self.bg, (0, 0))
-
-        # Draw game background
-        self.game_sc.blit(self.game_bg, (0, 0))
-
-        # Draw grid
-        [pygame.draw.rect(self.game_sc, (40, 40, 40), i_rect, 1)
-         for i_rect in self.grid]
-
-        # Draw figure
-        for i in range(4):
-            self.figure_rect.x = self.figure[i].x * self.TILE
-            self.figure_rect.y = self.figure[i].y * self.TILE
-            pygame.draw.rect(self.game_sc, self.color, self.figure_rect)
-
-        # Draw field
-        for y, raw in enumerate(self.field):
-            for x, col in enumerate(raw):
-                if col:
-                    self.figure_rect.x, self.figure_rect.y = x * self.TILE, y * self.TILE
-                    pygame.draw.rect(self.game_sc, col, self.figure_rect)
-
-        # Blit game surface to main screen
-        screen.blit(self.game_sc, (self.game_sc_x, self.game_sc_y))
-
-        # Title position
-        screen.blit(self.title_tetris, (self.sidebar_x, self.game_sc_y + 20))
-
-        # Dfficulty text
-        screen.blit(self.title_difficulty,
-                    (self.sidebar_x, self.game_sc_y + 120))
-
-        # Score text
-        screen.blit(self.title_score, (self.sidebar_x,
-                    self.game_sc_y + 200))
-        # Space between score label and score value
-        screen.blit(self.font.render(str(self.score), True, pygame.Color('white')),
-                    (self.sidebar_x + 15, self.game_sc_y + 270))
-
-        # Draw next figure with space
-        next_figure_x = self.sidebar_x
-        next_figure_y = self.game_sc_y + 450
-
-        # Next Figure text
-        next_text = self.font.render(
-            "NEXT FIGURE", True, pygame.Color('white'))
-        screen.blit(next_text, (next_figure_x, next_figure_y - 80))
-
-        # Draw the next figure
-        for i in range(4):
-            self.figure_rect.x = self.next_figure[i].x * \
-                self.TILE + next_figure_x
-            self.figure_rect.y = self.next_figure[i].y * \
-                self.TILE + next_figure_y
-            pygame.draw.rect(screen, self.next_color, self.figure_rect)
-
-        # Handle game over animation
+        """Draw what changed since the last frame on the main screen and
+        return the dirty rects"""
+        engine = self.engine
+        dirty = []
+        if self.full_redraw:
+            self.full_redraw = False
+            if self.screen_bg is None:
+                self.build_screen_bg()
+            screen.blit(self.screen_bg, (0, 0))
+            dirty.append(screen.get_rect())
+            self.values.clear()
+            self.piece_rect = self.preview_rect = None
+            self.stack_drawn = None
+
+        # The stack layer holds the grid, the locked cells and the hint. It
+        # only changes when a piece locks, the game resets or rewinds, or a
+        # hint arrives.
+        hint = tuple(self.hint.cells(engine.shape)) if self.hints else None
+        stack_key = (engine.seed, engine.pieces, hint)
+        if stack_key != self.stack_key:
+            self.stack_key = stack_key
+            # The board's color plane is an 8-bit image of one pixel per
+            # cell, scaling it to tile size draws every cell at once
+            board = engine.board
+            cells = pygame.image.frombuffer(board.cells, (self.W, self.H), 'P')
+            cells.set_palette(board.palette)
+            cells.set_colorkey(0)
+            self.stack_sc.blit(self.board_bg, (0, 0))
+            self.stack_sc.blit(pygame.transform.scale(cells, self.GAME_RES), (0, 0))
+            if self.cell_gaps:
+                self.stack_sc.blit(self.cell_gaps, (0, 0))
+            # The hint is an outline under the figure
+            for x, y in hint or ():
+                self.figure_rect.x, self.figure_rect.y = x * self.TILE, y * self.TILE
+                pygame.draw.rect(self.stack_sc, engine.color, self.figure_rect, 2)
+
+        board_rect = self.board_rect
+        piece_key = (engine.shape, engine.rotation, engine.piece_x,
+                     engine.piece_y, engine.color)
+        if self.stack_drawn != self.stack_key or self.game_over:
+            # The whole board: stack, figure and the game over animation
+            self.stack_drawn = self.stack_key
+            screen.blit(self.stack_sc, board_rect)
+            self.piece_key = None
+            self.piece_rect = None
+            dirty.append(board_rect)
+        elif piece_key != self.piece_key and self.piece_rect is not None:
+            # Only the figure moved, put the stack back where it was
+            screen.blit(self.stack_sc, self.piece_rect,
+                        self.piece_rect.move(-board_rect.x, -board_rect.y))
+            dirty.append(self.piece_rect)
+
+        if piece_key != self.piece_key:
+            self.piece_key = piece_key
+            sprite, min_dx, min_dy = self.piece_sprite(
+                engine.shape, engine.rotation, engine.color, self.TILE,
+                self.figure_rect.w)
+            # Cells above the top edge are not drawn
+            screen.set_clip(board_rect)
+            rect = screen.blit(sprite, (
+                board_rect.x + (engine.piece_x + min_dx) * self.TILE,
+                board_rect.y + (engine.piece_y + min_dy) * self.TILE))
+            screen.set_clip(None)
+            self.piece_rect = rect
+            dirty.append(rect)
+
+        # Score, and the record next to it from the store's cache
+        self.draw_value(screen, 'score', engine.score, 'white',
+                        (self.sidebar_x + 15, self.game_sc_y + 270), dirty)
+        if self.scores:
+            self.draw_value(screen, 'best', self.scores.best(self.difficulty),
+                            'gold', (self.sidebar_x + 225, self.game_sc_y + 270),
+                            dirty)
+
+        # Draw the next figure where it would spawn on a 10 wide board
+        preview_key = (engine.next_shape, engine.next_color)
+        if preview_key != self.preview_key or self.preview_rect is None:
+            self.preview_key = preview_key
+            if self.preview_rect is not None:
+                screen.blit(self.screen_bg, self.preview_rect, self.preview_rect)
+                dirty.append(self.preview_rect)
+            sprite, min_dx, min_dy = self.piece_sprite(
+                engine.next_shape, 0, engine.next_color, self.PREVIEW_TILE,
+                self.preview_cell)
+            x, y = spawn_position(engine.next_shape, 10)
+            self.preview_rect = screen.blit(sprite, (
+                self.sidebar_x + (x + min_dx) * self.PREVIEW_TILE,
+                self.game_sc_y + 450 + (y + min_dy) * self.PREVIEW_TILE))
+            dirty.append(self.preview_rect)
+
+        # Handle game over animation, the grid fills up one cell at a time
+        # across frames
         if self.game_over:
-            for i_rect in self.grid:
-                pygame.draw.rect(self.game_sc, self.get_color(), i_rect)
-                screen.blit(self.game_sc, (self.game_sc_x, self.game_sc_y))
-                pygame.display.flip()
-                pygame.time.delay(1)  # Shorter delay for smoother integration
-            self.game_over = False
-
-            # Launch final scene
-            self.game_state.tetris_difficulty = self.difficulty
-            self.game_state.current_scene = 'final_scene'
+            elapsed = pygame.time.get_ticks() - self.game_over_start
+            filled = min(len(self.grid),
+                         elapsed * len(self.grid) // self.GAME_OVER_MS + 1)
+            # Only the cells new since the last frame are drawn
+            for i_rect in self.grid[self.game_over_filled:filled]:
+                pygame.draw.rect(self.game_over_sc, self.get_color(), i_rect)
+            self.game_over_filled = filled
+            screen.blit(self.game_over_sc, board_rect)
+
+            if filled == len(self.grid):
+                self.game_over = False
+                self.stack_drawn = None
+
+                # Launch final scene
+                self.game_state.tetris_difficulty = self.difficulty
+                self.game_state.current_scene = 'final_scene'
+        return dirty
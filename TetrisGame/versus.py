@@ -0,0 +1,374 @@
+import argparse
+import math
+import os
+import random
+import sys
+import time
+import pygame
+
+# Make the TetrisGame package importable when running from this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from TetrisGame.tetris_engine import TetrisEngine, NOOP, LEFT, RIGHT, ROTATE, SOFT_DROP
+from TetrisGame.difficulty import DIFFICULTY_PROFILES, difficulty_name, profile_gravity
+from TetrisGame.bot import TetrisBot
+
+# Garbage lines sent to an opponent for the lines cleared by one piece
+GARBAGE = {0: 0, 1: 0, 2: 1, 3: 2, 4: 4}
+
+# Keys of the local players
+KEYMAPS = [
+    {pygame.K_LEFT: LEFT, pygame.K_RIGHT: RIGHT,
+     pygame.K_DOWN: SOFT_DROP, pygame.K_UP: ROTATE},
+    {pygame.K_a: LEFT, pygame.K_d: RIGHT,
+     pygame.K_s: SOFT_DROP, pygame.K_w: ROTATE},
+]
+
+# Bot reaction ticks and ticks between inputs for each difficulty
+BOT_SPEEDS = {
+    'easy': (30, 10),
+    'medium': (20, 6),
+    'hard': (8, 2),
+}
+
+BG_COLOR = (20, 20, 30)
+BOARD_COLOR = (0, 0, 0)
+GRID_COLOR = (40, 40, 40)
+
+
+class TileAtlas:
+    """Pre-rendered cell tiles of one size shared by every board, so a
+    board redraw is a single blits() call"""
+
+    MAX_TILES = 1024
+
+    def __init__(self, tile):
+        self.tile = tile
+        self.tiles = {}
+
+    def get(self, color):
+        surface = self.tiles.get(color)
+        if surface is None:
+            if len(self.tiles) >= self.MAX_TILES:
+                self.tiles.clear()
+            # Leave a gap between cells like TetrisScene
+            gap = 1 if self.tile > 4 else 0
+            surface = pygame.Surface((self.tile, self.tile)).convert()
+            surface.fill(BOARD_COLOR)
+            surface.fill(color, (0, 0, self.tile - gap, self.tile - gap))
+            self.tiles[color] = surface
+        return surface
+
+
+class BoardView:
+    """Screen area of one board. It keeps its own surface and only redraws
+    it when the engine's board, piece or status changed."""
+
+    LABEL_H = 20
+    GARBAGE_W = 6
+
+    def __init__(self, engine, label, pos, tile, atlas, background, font):
+        self.engine = engine
+        self.label = label
+        self.tile = tile
+        self.atlas = atlas
+        self.background = background
+        self.font = font
+        board_w, board_h = engine.W * tile, engine.H * tile
+        self.rect = pygame.Rect(pos, (board_w + self.GARBAGE_W + 2,
+                                      board_h + self.LABEL_H))
+        self.surface = pygame.Surface(self.rect.size).convert()
+        # Locked cells, redrawn only when a piece locks or garbage rises
+        self.field = pygame.Surface((board_w, board_h)).convert()
+        self.field_key = None
+        self.view_key = None
+
+    def draw(self, status=''):
+        """Redraw the board if anything on it changed, returns whether it
+        did"""
+        engine = self.engine
+        field_key = (engine.seed, engine.pieces)
+        if field_key != self.field_key:
+            self.field_key = field_key
+            self.field.blit(self.background, (0, 0))
+            tile, get = self.tile, self.atlas.get
+            self.field.blits([(get(color), (x * tile, y * tile))
+                              for x, y, color in engine.board.filled_cells()],
+                             doreturn=False)
+
+        view_key = (field_key, engine.shape, engine.rotation, engine.piece_x,
+                    engine.piece_y, engine.pending_garbage, engine.lines, status)
+        if view_key == self.view_key:
+            return False
+        self.view_key = view_key
+
+        surface, tile = self.surface, self.tile
+        surface.fill(BG_COLOR)
+        text = f"{self.label}  {engine.lines}"
+        surface.blit(self.font.render(text, True, pygame.Color('white')), (0, 2))
+
+        board_x, board_y = self.GARBAGE_W + 2, self.LABEL_H
+        surface.blit(self.field, (board_x, board_y))
+        if not engine.game_over:
+            piece = self.atlas.get(engine.color)
+            surface.blits([(piece, (board_x + x * tile, board_y + y * tile))
+                           for x, y in engine.piece_cells() if y >= 0],
+                          doreturn=False)
+
+        # Incoming garbage as a bar next to the board
+        if engine.pending_garbage:
+            height = min(engine.H, engine.pending_garbage) * tile
+            surface.fill((200, 40, 40), (0, board_y + engine.H * tile - height,
+                                         self.GARBAGE_W, height))
+
+        if status:
+            label = self.font.render(status, True, pygame.Color('gold'))
+            surface.blit(label, label.get_rect(
+                center=(board_x + engine.W * tile // 2,
+                        board_y + engine.H * tile // 2)))
+        return True
+
+
+class VersusMatch:
+    """Rules of a versus game without any display: one engine per board,
+    the bots, and garbage sent between boards.
+
+    Clearing 2 or more lines sends garbage to the next board still in the
+    game. Every board plays the same piece sequence. The last board
+    standing wins.
+    """
+
+    # Bot searches allowed per tick. The others put their search off a tick
+    # so bots that get a new piece on the same tick do not add up in one
+    # frame. Their boards still step.
+    MAX_SEARCHES = 2
+
+    def __init__(self, players=1, bots=3, difficulty='medium', width=10,
+                 height=15, seed=None):
+        self.difficulty = difficulty_name(difficulty)
+        self.players = players
+        count = players + bots
+        if not 2 <= count <= 16:
+            raise ValueError("Versus needs 2 to 16 boards")
+
+        gravity = profile_gravity(DIFFICULTY_PROFILES[self.difficulty])
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.engines = [TetrisEngine(**gravity, width=width, height=height,
+                                     seed=self.seed) for _ in range(count)]
+        reaction, interval = BOT_SPEEDS[self.difficulty]
+        # Bots react a little differently, identical bots on the same pieces
+        # would play identical games
+        self.bots = [None] * players + [
+            TetrisBot(width, height, reaction_ticks=reaction + bot * 7 % 11,
+                      input_interval=interval) for bot in range(bots)]
+        # Inputs of the local players for the next tick
+        self.actions = [NOOP] * count
+        self.winner = None
+        # First board offered a search next tick, it moves on every tick so
+        # every bot waits in turn
+        self.search_start = 0
+
+    def new_round(self, seed=None):
+        self.seed = random.getrandbits(64) if seed is None else seed
+        for engine in self.engines:
+            engine.reset(self.seed)
+        self.actions = [NOOP] * len(self.engines)
+        self.winner = None
+        self.search_start = 0
+
+    def update(self):
+        """Advance every board by one tick"""
+        if self.winner is not None:
+            return
+        engines = self.engines
+        count = len(engines)
+        # Bots that may search this tick, taken round robin
+        searching = set()
+        for step in range(count):
+            i = (self.search_start + step) % count
+            bot = self.bots[i]
+            if (len(searching) < self.MAX_SEARCHES and bot is not None
+                    and not engines[i].game_over and bot.needs_search(engines[i])):
+                searching.add(i)
+        self.search_start = (self.search_start + 1) % count
+
+        for i, engine in enumerate(engines):
+            if engine.game_over:
+                continue
+            bot = self.bots[i]
+            if bot is not None and (i in searching or not bot.needs_search(engine)):
+                self.actions[i] = bot.next_action(engine)
+            lines = engine.step(self.actions[i])
+            self.actions[i] = NOOP
+            if GARBAGE[lines]:
+                target = self.next_alive(i)
+                if target is not None:
+                    engines[target].add_garbage(GARBAGE[lines])
+
+        alive = [i for i, engine in enumerate(engines) if not engine.game_over]
+        if len(alive) <= 1:
+            self.winner = alive[0] if alive else -1
+
+    def next_alive(self, i):
+        count = len(self.engines)
+        for step in range(1, count):
+            target = (i + step) % count
+            if not self.engines[target].game_over:
+                return target
+        return None
+
+
+class VersusScene:
+    """Local versus Tetris for 2-16 boards, local players plus bots.
+    Enter starts the next round once a board has won."""
+
+    RES = 900, 700
+    ROUND_OVER_TEXT = "ENTER: next round"
+
+    def __init__(self, game_state=None, players=1, bots=3, difficulty='medium',
+                 width=10, height=15, seed=None):
+        self.game_state = game_state
+        if players > len(KEYMAPS):
+            raise ValueError(f"At most {len(KEYMAPS)} local players")
+        self.match = VersusMatch(players, bots, difficulty, width, height, seed)
+        labels = [f"P{i + 1}" for i in range(players)]
+        labels += [f"BOT {i + 1}" for i in range(bots)]
+        self.layout(self.match.engines, labels, width, height)
+
+    @property
+    def winner(self):
+        return self.match.winner
+
+    def layout(self, boards, labels, width, height):
+        """Place one BoardView per board (an engine or anything with the
+        same attributes) on the screen"""
+        count = len(boards)
+        # Pick the column count that gives the biggest tiles
+        best = None
+        for cols in range(1, count + 1):
+            rows = math.ceil(count / cols)
+            cell_w, cell_h = self.RES[0] // cols, self.RES[1] // rows
+            tile = min((cell_w - BoardView.GARBAGE_W - 12) // width,
+                       (cell_h - BoardView.LABEL_H - 10) // height)
+            if best is None or tile > best[0]:
+                best = tile, cols, cell_w, cell_h
+        tile, cols, cell_w, cell_h = best
+        tile = max(1, tile)
+
+        # Empty board with its grid, shared by all boards
+        background = pygame.Surface((width * tile, height * tile)).convert()
+        background.fill(BOARD_COLOR)
+        if tile > 4:
+            for x in range(width):
+                for y in range(height):
+                    pygame.draw.rect(background, GRID_COLOR,
+                                     (x * tile, y * tile, tile, tile), 1)
+        atlas = TileAtlas(tile)
+        font = pygame.font.Font(None, 24)
+        self.big_font = pygame.font.Font(None, 48)
+
+        self.views = []
+        for i, (board, label) in enumerate(zip(boards, labels)):
+            col, row = i % cols, i // cols
+            self.views.append(BoardView(board, label,
+                                        (col * cell_w + 6, row * cell_h + 5),
+                                        tile, atlas, background, font))
+        self.full_redraw = True
+
+    def new_round(self):
+        self.match.new_round()
+        self.full_redraw = True
+
+    def handle_events(self, event):
+        if event.type != pygame.KEYDOWN:
+            return
+        if self.winner is not None and event.key == pygame.K_RETURN:
+            self.new_round()
+            return
+        for player, keymap in enumerate(KEYMAPS[:self.match.players]):
+            if event.key in keymap:
+                self.match.actions[player] |= keymap[event.key]
+
+    def update(self):
+        self.match.update()
+
+    def render(self, screen):
+        """Draw the boards that changed and return the dirty rects"""
+        dirty = []
+        if self.full_redraw:
+            self.full_redraw = False
+            screen.fill(BG_COLOR)
+            dirty.append(screen.get_rect())
+            for view in self.views:
+                view.view_key = None
+
+        for i, view in enumerate(self.views):
+            status = ''
+            if self.winner == i:
+                status = 'WINNER'
+            elif view.engine.game_over:
+                status = 'KO'
+            if view.draw(status):
+                screen.blit(view.surface, view.rect)
+                dirty.append(view.rect)
+
+        if self.winner is not None:
+            text = self.big_font.render(self.ROUND_OVER_TEXT, True,
+                                        pygame.Color('white'), BG_COLOR)
+            rect = text.get_rect(midbottom=(self.RES[0] // 2, self.RES[1] - 2))
+            screen.blit(text, rect)
+            dirty.append(rect)
+        return dirty
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local versus Tetris")
+    parser.add_argument('--players', type=int, default=1, choices=[0, 1, 2])
+    parser.add_argument('--bots', type=int, default=3)
+    parser.add_argument('--difficulty', choices=list(DIFFICULTY_PROFILES),
+                        default='medium')
+    parser.add_argument('--width', type=int, default=10)
+    parser.add_argument('--height', type=int, default=15)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--seconds', type=float,
+                        help="quit after this long and print frame times")
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode(VersusScene.RES)
+    pygame.display.set_caption("TETRIS VERSUS")
+    scene = VersusScene(None, args.players, args.bots, args.difficulty,
+                        args.width, args.height, args.seed)
+
+    clock = pygame.time.Clock()
+    update_step = 1000 / 60
+    accumulator = 0
+    frame_times = []
+    start = time.perf_counter()
+    while args.seconds is None or time.perf_counter() - start < args.seconds:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            scene.handle_events(event)
+
+        accumulator = min(accumulator + clock.tick(60), 250)
+        # Time spent on the frame, without waiting for the next one
+        frame_start = time.perf_counter()
+        while accumulator >= update_step:
+            scene.update()
+            accumulator -= update_step
+        # Only the boards that changed are sent to the display
+        pygame.display.update(scene.render(screen))
+        frame_times.append((time.perf_counter() - frame_start) * 1000)
+
+    # No frame runs at all when --seconds is 0
+    if frame_times:
+        frame_times.sort()
+        print(f"{len(frame_times)} frames, work per frame: mean "
+              f"{sum(frame_times) / len(frame_times):.2f} ms, p99 "
+              f"{frame_times[int(len(frame_times) * 0.99)]:.2f} ms")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import multiprocessing
+import os
 import pygame
 import sys
 from scenes.act1_storyline import StorylineScene
@@ -5,6 +7,7 @@ from scenes.act2_characters import CharactersScene
 from scenes.act3_multipleChoice import DecisionDescriptionScene
 from scenes.avatar_profile import AvatarProfile
 from TetrisGame.tetris_game import TetrisScene
+from TetrisGame.scores import ScoreStore
 from scenes.final_scene import FinalScene
 from scenes.game_purpose import GamePurposeScene
 
@@ -25,6 +28,9 @@ class GameState:
         # Initialize scenes dictionary
         self.scenes = {}
 
+        # Tetris high scores, cached in memory and saved in the background
+        self.scores = ScoreStore()
+
     def can_select_more_questions(self):
         return len(self.selected_questions) < self.max_questions
 
@@ -52,6 +58,17 @@ class GameState:
 
 
 class SceneManager:
+    # Scenes are updated at a fixed rate and rendered at most at MAX_FPS
+    UPDATE_RATE = 60
+    MAX_FPS = 60
+    # Longest frame time that is caught up with updates, in milliseconds
+    MAX_FRAME_TIME = 250
+    # Longest sleep of a scene waiting for events, in milliseconds. Scene
+    # changes made outside event handling are picked up this late at most.
+    IDLE_TIMEOUT = 500
+    # Set this environment variable to print the Tetris input latency at exit
+    LATENCY_REPORT_ENV = 'TETRIS_LATENCY_REPORT'
+
     def __init__(self):
         pygame.init()
         self.screen = pygame.display.set_mode((900, 700))
@@ -73,13 +90,20 @@ class SceneManager:
     def run(self):
         clock = pygame.time.Clock()
         running = True
+        update_step = 1000 / self.UPDATE_RATE
+        # Milliseconds of elapsed time not simulated yet
+        accumulator = 0
+        previous_scene = None
+        # The whole window is presented on the first frame of a scene
+        full_present = True
 
         while running:
             # Create Tetris scene on demand with the correct difficulty
             if self.game_state.current_scene == 'tetris' and 'tetris' not in self.scenes:
                 self.scenes['tetris'] = TetrisScene(
                     self.game_state,
-                    difficulty=self.game_state.tetris_difficulty
+                    difficulty=self.game_state.tetris_difficulty,
+                    scores=self.game_state.scores
                 )
                 # Update scenes in game state
                 self.game_state.scenes = self.scenes
@@ -97,19 +121,83 @@ class SceneManager:
                 self.game_state.scenes = self.scenes
 
             current_scene = self.scenes[self.game_state.current_scene]
-
-            for event in pygame.event.get():
+            # Scenes that only draw what changed start from a full frame
+            # when they come back on screen
+            if current_scene is not previous_scene:
+                previous_scene = current_scene
+                full_present = True
+                # Time spent on the old scene is not simulated in the new one
+                clock.tick()
+                accumulator = 0
+                if hasattr(current_scene, 'invalidate'):
+                    current_scene.invalidate()
+
+            continuous = getattr(current_scene, 'CONTINUOUS', False)
+            if continuous:
+                # Wait for the frame before reading input, so the input goes
+                # into the frame drawn right after instead of waiting a frame
+                frame_time = clock.tick(self.MAX_FPS)
+                events = pygame.event.get()
+            else:
+                # Static scenes only change on input, so sleep until an event
+                # comes instead of drawing the same frame every tick. A scene
+                # that just came on screen is drawn right away.
+                events = [] if full_present else [pygame.event.wait(self.IDLE_TIMEOUT)]
+                # Still draw at most MAX_FPS frames while events keep coming
+                clock.tick(self.MAX_FPS)
+                events += pygame.event.get()
+                events = [event for event in events if event.type != pygame.NOEVENT]
+                if not events and not full_present:
+                    continue
+
+            if hasattr(current_scene, 'on_poll'):
+                current_scene.on_poll()
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    # The window contents were lost, draw them all again
+                    full_present = True
+                    if hasattr(current_scene, 'invalidate'):
+                        current_scene.invalidate()
                 current_scene.handle_events(event)
 
-            if hasattr(current_scene, 'update'):
+            if continuous:
+                # Run as many fixed-size updates as the elapsed time needs, so
+                # game speed does not depend on the frame rate. Long stalls are
+                # dropped instead of caught up.
+                accumulator = min(accumulator + frame_time, self.MAX_FRAME_TIME)
+                # Input read this frame is applied this frame: when no update is
+                # due yet the next one runs early, and its time comes out of the
+                # following frames
+                run_early = (accumulator >= 0 and hasattr(current_scene, 'input_pending')
+                             and current_scene.input_pending())
+                while accumulator >= update_step or run_early:
+                    run_early = False
+                    current_scene.update()
+                    accumulator -= update_step
+            elif hasattr(current_scene, 'update'):
+                # Static scenes get one update per drawn frame
                 current_scene.update()
 
-            current_scene.render(self.screen)
-            pygame.display.flip()
-            clock.tick(60)
-
+            # Scenes may return the regions they changed, only those are
+            # presented. None means the whole screen was drawn.
+            dirty = current_scene.render(self.screen)
+            if dirty is None or full_present:
+                pygame.display.flip()
+                full_present = False
+            elif dirty:
+                pygame.display.update(dirty)
+            if hasattr(current_scene, 'on_present'):
+                current_scene.on_present()
+
+        self.game_state.scores.close()
+        for scene in self.scenes.values():
+            if hasattr(scene, 'close'):
+                scene.close()
+            if (os.environ.get(self.LATENCY_REPORT_ENV)
+                    and hasattr(scene, 'latency_report') and scene.latency_report()):
+                print(scene.latency_report())
         pygame.quit()
         sys.exit()
 
@@ -120,4 +208,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Tetris hints run in a worker process, which needs this in a frozen
+    # build
+    multiprocessing.freeze_support()
     main()
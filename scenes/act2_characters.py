@@ -144,6 +144,20 @@ class CharactersScene:
 
         self.hovered_avatar = None
 
+        # Hover and counter state of the last drawn frame, to present only
+        # what changed since
+        self.drawn_state = None
+        self.full_redraw = True
+
+    def invalidate(self):
+        """Draw and present the whole screen on the next render"""
+        self.full_redraw = True
+
+    def avatar_rect(self, idx):
+        """Screen area of an avatar including its hover highlight"""
+        pos = self.avatar_positions[idx]
+        return pygame.Rect(pos[0] - 5, pos[1] - 5, 160, 160)
+
     def handle_character_click(self, character_index):
         # print(f"Clicked character {character_index}")  # Debug print
 
@@ -200,6 +214,14 @@ class CharactersScene:
                     break
 
     def render(self, screen):
+        state = (self.hovered_avatar, self.back_button_hover,
+                 self.continue_button_hover, self.game_state.get_selected_count())
+        if state == self.drawn_state and not self.full_redraw:
+            return []
+        dirty = self.changed_rects(state, screen)
+        self.drawn_state = state
+        self.full_redraw = False
+
         screen.fill(self.background_color)
 
         # Draw question counter at the top
@@ -293,3 +315,21 @@ class CharactersScene:
             bottom=hint_rect.top - 5  # Position above the hint text with spacing
         )
         screen.blit(desc_text, desc_rect)
+        return dirty
+
+    def changed_rects(self, state, screen):
+        """Screen areas that differ between the last drawn frame and one
+        drawn with `state`"""
+        drawn = self.drawn_state
+        if self.full_redraw or drawn is None or drawn[3] != state[3]:
+            return [screen.get_rect()]
+        dirty = []
+        if drawn[0] != state[0]:
+            # The highlight left one avatar and moved to another
+            dirty += [self.avatar_rect(idx) for idx in (drawn[0], state[0])
+                      if idx is not None]
+        if drawn[1] != state[1]:
+            dirty.append(self.back_button)
+        if drawn[2] != state[2]:
+            dirty.append(self.continue_button)
+        return dirty
@@ -0,0 +1,73 @@
+import pygame
+
+
+class Layer:
+    """One part of a scene, drawn into its own surface and kept there.
+
+    `draw(surface)` paints the layer in its own coordinates. `key()` returns
+    the state the layer depends on, the surface is only drawn again when
+    that value changes. Layers without a key are drawn once.
+    """
+
+    def __init__(self, rect, draw, key=None, alpha=None, transparent=False):
+        self.rect = pygame.Rect(rect)
+        self.draw = draw
+        self.key = key
+        # Surface-wide alpha, or per-pixel alpha for layers that do not
+        # cover their whole rect
+        self.alpha = alpha
+        self.transparent = transparent
+        self.surface = None
+        self.drawn_key = None
+
+    def refresh(self):
+        """Draw the layer again if its inputs changed, returns whether it
+        did"""
+        key = self.key() if self.key else None
+        if self.surface is not None and key == self.drawn_key:
+            return False
+        if self.surface is None:
+            if self.transparent:
+                self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+            else:
+                self.surface = pygame.Surface(self.rect.size)
+            if self.alpha is not None:
+                self.surface.set_alpha(self.alpha)
+        elif self.transparent:
+            self.surface.fill((0, 0, 0, 0))
+        self.draw(self.surface)
+        self.drawn_key = key
+        return True
+
+
+class Compositor:
+    """Layers of a scene stacked bottom to top onto the screen.
+
+    render() only recomposes the areas of layers that were drawn again, and
+    returns them as the scene's dirty rects for the scene manager.
+    """
+
+    def __init__(self, layers):
+        self.layers = layers
+        self.full_redraw = True
+
+    def invalidate(self):
+        """Compose every layer on the next render"""
+        self.full_redraw = True
+
+    def render(self, screen):
+        dirty = [layer.rect for layer in self.layers if layer.refresh()]
+        if self.full_redraw:
+            self.full_redraw = False
+            for layer in self.layers:
+                screen.blit(layer.surface, layer.rect)
+            return [screen.get_rect()]
+
+        # Layers below and above a changed one show through in its area
+        for rect in dirty:
+            screen.set_clip(rect)
+            for layer in self.layers:
+                if layer.rect.colliderect(rect):
+                    screen.blit(layer.surface, layer.rect)
+        screen.set_clip(None)
+        return dirty
@@ -1,6 +1,7 @@
 import pygame
 import os
 import sys
+from scenes.compositor import Compositor, Layer
 
 
 def resource_path(relative_path):
@@ -69,6 +70,16 @@ class FinalScene:
         # Set message content based on difficulty
         self.set_message_content()
 
+        # The message is wrapped and drawn once, only the button changes
+        # after the first frame
+        self.compositor = Compositor([
+            Layer((0, 0, self.screen_width, self.screen_height),
+                  self._draw_background),
+            Layer(self.message_box, self._draw_message, transparent=True),
+            Layer(self.continue_button, self._draw_button,
+                  key=lambda: self.continue_hover, transparent=True),
+        ])
+
     def set_message_content(self):
         """Set message content based on difficulty level"""
         if self.difficulty == 'easy':
@@ -103,26 +114,32 @@ class FinalScene:
                 self.game_state.current_scene = 'game_purpose'
                 return
 
+    def invalidate(self):
+        self.compositor.invalidate()
+
     def render(self, screen):
         """Render the final scene"""
+        return self.compositor.render(screen)
+
+    def _draw_background(self, surface):
         # Clear screen with background
-        screen.blit(self.bg, (0, 0))
+        surface.blit(self.bg, (0, 0))
 
         # Draw title
         title_surface = self.title_font.render(
             self.title_text, True, self.BLACK)
         title_rect = title_surface.get_rect(centerx=self.screen_width//2, y=80)
-        screen.blit(title_surface, title_rect)
+        surface.blit(title_surface, title_rect)
 
+    def _draw_message(self, surface):
         # Draw message box
-        pygame.draw.rect(screen, self.box_color,
-                         self.message_box, border_radius=10)
-        pygame.draw.rect(screen, self.BLACK, self.message_box,
-                         2, border_radius=10)
+        box = surface.get_rect()
+        pygame.draw.rect(surface, self.box_color, box, border_radius=10)
+        pygame.draw.rect(surface, self.BLACK, box, 2, border_radius=10)
 
         # Draw message text with proper word wrapping to stay inside the box
-        max_width = self.message_box.width - 40  # Leave 20px padding on each side
-        y_offset = self.message_box.y + 20  # Start a bit higher
+        max_width = box.width - 40  # Leave 20px padding on each side
+        y_offset = 20  # Start a bit higher
 
         for line in self.message_text:
             if not line:  # Skip empty lines
@@ -149,8 +166,8 @@ class FinalScene:
                         text_surface = self.text_font.render(
                             text, True, self.BLACK)
                         text_rect = text_surface.get_rect(
-                            centerx=self.screen_width//2, y=y_offset)
-                        screen.blit(text_surface, text_rect)
+                            centerx=box.centerx, y=y_offset)
+                        surface.blit(text_surface, text_rect)
                         y_offset += 25
 
                     # Start a new line with the current word
@@ -162,15 +179,16 @@ class FinalScene:
                 text = ' '.join(current_line)
                 text_surface = self.text_font.render(text, True, self.BLACK)
                 text_rect = text_surface.get_rect(
-                    centerx=self.screen_width//2, y=y_offset)
-                screen.blit(text_surface, text_rect)
+                    centerx=box.centerx, y=y_offset)
+                surface.blit(text_surface, text_rect)
                 y_offset += 25
 
-         # Draw continue button
+    def _draw_button(self, surface):
+        # Draw continue button
         button_color = self.HOVER_BLUE if self.continue_hover else self.BLUE
-        pygame.draw.rect(screen, button_color,
-                         self.continue_button, border_radius=5)
+        pygame.draw.rect(surface, button_color,
+                         surface.get_rect(), border_radius=5)
         continue_text = self.button_font.render("Continue", True, self.WHITE)
         continue_rect = continue_text.get_rect(
-            center=self.continue_button.center)
-        screen.blit(continue_text, continue_rect)
+            center=surface.get_rect().center)
+        surface.blit(continue_text, continue_rect)
@@ -1,6 +1,7 @@
 import pygame
 import os
 import sys
+from scenes.compositor import Compositor, Layer
 
 
 def resource_path(relative_path):
@@ -69,6 +70,18 @@ class GamePurposeScene:
                                        self.screen_height - 100, 150, 50)
         self.button_color = (100, 200, 255)
         self.button_hover_color = (150, 220, 255)
+        self.button_hover = False
+
+        # Only the exit button changes after the first frame
+        self.compositor = Compositor([
+            Layer((0, 0, self.screen_width, self.screen_height),
+                  self._draw_background),
+            # Increased height for the multi-line content
+            Layer((20, 100, self.screen_width - 40, 450), self._draw_content,
+                  alpha=200),
+            Layer(self.button_rect, self._draw_button,
+                  key=lambda: self.button_hover),
+        ])
 
     def handle_events(self, event):
         """Handle user input events"""
@@ -76,46 +89,48 @@ class GamePurposeScene:
             if event.button == 1:  # Left mouse button
                 mouse_pos = pygame.mouse.get_pos()
                 if self.button_rect.collidepoint(mouse_pos):
-                    # Exit the game
-                    pygame.quit()
-                    sys.exit()
+                    # Exit the game through the scene manager, so it
+                    # saves and closes everything first
+                    pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+    def invalidate(self):
+        self.compositor.invalidate()
 
     def render(self, screen):
         """Render the purpose scene with same style as act1_storyline"""
+        self.button_hover = self.button_rect.collidepoint(pygame.mouse.get_pos())
+        return self.compositor.render(screen)
+
+    def _draw_background(self, surface):
         # Check if background image is loaded
         if self.background_image:
-            screen.blit(self.background_image, (0, 0))
+            surface.blit(self.background_image, (0, 0))
         else:
-            screen.fill(self.WHITE)
+            surface.fill(self.WHITE)
 
         # Render title
         title_surface = self.font.render(self.title, True, self.BLACK)
         title_rect = title_surface.get_rect(
             center=(self.screen_width // 2, 50))
-        screen.blit(title_surface, title_rect)
+        surface.blit(title_surface, title_rect)
 
-        text_container_height = 450  # Increased height for the multi-line content
-        text_container = pygame.Surface(
-            (self.screen_width - 40, text_container_height))
-        text_container.set_alpha(200)
+    def _draw_content(self, text_container):
         text_container.fill(self.WHITE)
 
         # Render wrapped text
         self._render_text_wrapped(text_container, self.content_text, 10, 10,
                                   self.font, self.BLACK, self.screen_width - 60)
-        screen.blit(text_container, (20, 100))
 
-        # Render exit button
-        mouse_pos = pygame.mouse.get_pos()
-        if self.button_rect.collidepoint(mouse_pos):
-            pygame.draw.rect(screen, self.button_hover_color, self.button_rect)
+    def _draw_button(self, surface):
+        if self.button_hover:
+            surface.fill(self.button_hover_color)
         else:
-            pygame.draw.rect(screen, self.button_color, self.button_rect)
+            surface.fill(self.button_color)
 
         # Button text
         button_text = self.button_font.render("Exit", True, self.WHITE)
-        button_text_rect = button_text.get_rect(center=self.button_rect.center)
-        screen.blit(button_text, button_text_rect)
+        button_text_rect = button_text.get_rect(center=surface.get_rect().center)
+        surface.blit(button_text, button_text_rect)
 
     def _render_text_wrapped(self, surface, text, x, y, font, color, max_width):
         """Modified text wrapping method that handles newlines"""